@@ -0,0 +1,25 @@
+"""Benchmark suite.
+
+Micro-benchmarks (no database needed):
+    python -m benchmarks.bench_expressions   expression evaluator vs. eval()
+    python -m benchmarks.bench_scoring       feedback scoring backends
+    python -m benchmarks.bench_game          Game.equality_error / evaluate / generate_equalities
+    python -m benchmarks.bench_metrics       MetricsMiddleware overhead per request
+    python -m benchmarks.bench_middleware    /api/ middleware stack: stock vs. admin layers skipped
+
+Database benchmarks (configured Postgres, no writes):
+    python -m benchmarks.bench_connections   per-request connection overhead with and without persistence
+
+Database benchmarks (throwaway Postgres test database):
+    python -m benchmarks.bench_api           latency and queries per request per endpoint
+    python -m benchmarks.bench_summary       admin games summary at scale
+    python -m benchmarks.bench_indexes       hot queries with and without indexes
+    python -m benchmarks.bench_storage       Play results/eqs_state: arrays vs. packed encoding
+    python -m benchmarks.bench_write_behind  /api/play/ p99 at peak class load, sync vs. write-behind
+
+Load test against a running server:
+    python -m benchmarks.loadgen --game ID --key KEY [--concurrency 500]
+
+Scripts that accept --save-baseline/--compare keep JSON baselines in
+benchmarks/baselines/ and exit with status 1 when a run regresses.
+"""
@@ -0,0 +1,74 @@
+"""In-process API benchmark: latency and SQL queries per request for each endpoint.
+
+Uses Django's test client against a seeded throwaway Postgres test database,
+so it goes through the full middleware stack but not the network.
+
+    python -m benchmarks.bench_api [--requests 500] [--save-baseline | --compare]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, latency_summary, setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from benchmarks.common import seed_database, test_database  # noqa: E402
+from benchmarks.loadgen import random_guess  # noqa: E402
+from nerdle_api.models import Game  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--plays', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with test_database():
+        seed_database(args.players, args.games, args.plays)
+        call_command('rebuild_player_game_states', verbosity=0)
+        game = Game.objects.order_by('-end').first()
+        game.create_equalities()
+
+        client = Client()
+        etag = client.get('/api/games/')['ETag']
+        endpoints = {
+            'games': lambda key: client.get('/api/games/'),
+            'games_304': lambda key: client.get('/api/games/', HTTP_IF_NONE_MATCH=etag),
+            'status': lambda key: client.get('/api/game/status/', {'game': game.id, 'key': key}),
+            'play': lambda key: client.post('/api/play/', {'game': game.id, 'key': key,
+                                                          'equality': random_guess(rng, game.eq_length)}),
+        }
+
+        results = {}
+        for name, request in endpoints.items():
+            latencies = []
+            queries = []
+            for _ in range(args.requests):
+                key = f'K{rng.randint(1, args.players)}'
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    request(key)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(len(ctx.captured_queries))
+            summary = latency_summary(latencies)
+            summary['queries'] = sum(queries) / len(queries)
+            results[name] = summary
+            print(f'{name:9s} p50 {summary["p50_ms"]:7.2f}  p95 {summary["p95_ms"]:7.2f}  '
+                  f'p99 {summary["p99_ms"]:7.2f} ms  {summary["queries"]:.2f} queries/request')
+
+    handle_baseline('api', results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Per-request connection overhead: new connection per request vs. persistent.
+
+Simulates the request cycle Django runs under gunicorn sync workers
+(request_started, one small query, request_finished) against the configured
+Postgres, with CONN_MAX_AGE=0 (connect on every request), a persistent
+connection, and a persistent connection with CONN_HEALTH_CHECKS. Point
+DATABASE_URL at a pgbouncer to measure the pooler instead.
+
+    python -m benchmarks.bench_connections [--requests 500] [--save-baseline | --compare]
+"""
+import argparse
+import time
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, latency_summary, setup_django
+
+setup_django()
+
+from django.core.signals import request_finished, request_started  # noqa: E402
+from django.db import connection  # noqa: E402
+
+
+MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent_checked': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def request_cycle():
+    request_started.send(sender=None)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        request_finished.send(sender=None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    results = {}
+    try:
+        for name, options in MODES.items():
+            connection.close()
+            connection.settings_dict.update(options)
+            request_cycle()  # la primera conexión no cuenta
+
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                request_cycle()
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[name] = summary = latency_summary(latencies)
+            print(f'{name:19s} mean {summary["mean_ms"]:7.3f}  p50 {summary["p50_ms"]:7.3f}  '
+                  f'p99 {summary["p99_ms"]:7.3f} ms/request')
+    finally:
+        connection.close()
+        connection.settings_dict.update(original)
+
+    handle_baseline('connections', results, args)
+
+
+if __name__ == '__main__':
+    main()
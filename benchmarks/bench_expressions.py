@@ -0,0 +1,61 @@
+"""Micro-benchmark: cached expression evaluator vs. the original eval() path.
+
+    python -m benchmarks.bench_expressions [--repeat N]
+"""
+import argparse
+import random
+import timeit
+
+from nerdle_api.expressions import resolve
+
+
+def eval_resolve(operation):
+    # Referencia: el camino original con eval (sólo para comparar)
+    try:
+        return eval(operation.replace('/', '//').replace('^', '**'))
+    except Exception:
+        return None
+
+
+def sample_expressions(count, operators='+-*/%^', seed=0):
+    rng = random.Random(seed)
+    expressions = []
+    for _ in range(count):
+        parts = [str(rng.randint(0, 99))]
+        for _ in range(rng.randint(1, 3)):
+            parts.append(rng.choice(operators))
+            parts.append(str(rng.randint(1, 9)))
+        expression = ''.join(parts)
+        if expression.count('^') <= 1:
+            expressions.append(expression)
+    return expressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    expressions = sample_expressions(args.count)
+    for e in expressions:
+        assert resolve(e) == eval_resolve(e), e
+
+    def run(fn):
+        return min(timeit.repeat(lambda: [fn(e) for e in expressions], number=1, repeat=args.repeat))
+
+    eval_time = run(eval_resolve)
+    resolve.cache_clear()
+    cold_time = min(timeit.repeat(lambda: (resolve.cache_clear(), [resolve(e) for e in expressions]),
+                                  number=1, repeat=args.repeat))
+    warm_time = run(resolve)
+
+    per = 1e6 / len(expressions)
+    print(f'expressions: {len(expressions)}')
+    print(f'eval:            {eval_time * per:8.2f} us/expr')
+    print(f'parser (cold):   {cold_time * per:8.2f} us/expr  x{eval_time / cold_time:.1f}')
+    print(f'parser (cached): {warm_time * per:8.2f} us/expr  x{eval_time / warm_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
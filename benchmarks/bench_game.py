@@ -0,0 +1,85 @@
+"""Micro-benchmarks for the Game hot methods across eq_length/operator configurations.
+
+Runs in memory (no database): times generate_equalities, the equation search
+behind create_equalities, without the pool draw, the tournament lookup or save.
+
+    python -m benchmarks.bench_game [--plays 2000] [--save-baseline | --compare]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, latency_summary, setup_django
+
+setup_django()
+
+from nerdle_api.models import Game  # noqa: E402
+from benchmarks.loadgen import random_guess  # noqa: E402
+
+
+CONFIGS = [
+    (5, '+-'),
+    (7, '+-*/'),
+    (8, '+-*/'),
+    (8, '+-*/%^'),
+    (10, '+-*/'),
+]
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def bench_config(eq_length, operators, args, rng):
+    game = Game(id=1, eq_length=eq_length, eq_count=args.eq_count, operators=operators)
+
+    def generate():
+        game.equalities = game.generate_equalities(game.eq_count)
+
+    create = timed(generate, args.games)
+
+    guesses = [random_guess(rng, eq_length, operators) for _ in range(args.plays)]
+    guesses += rng.sample(game.equalities, len(game.equalities))
+    valid = [g for g in guesses if game.check_play(g)] or game.equalities
+
+    guess_iter = iter(guesses * 2)
+    error = timed(lambda: game.equality_error(next(guess_iter)), len(guesses))
+    valid_iter = iter(valid * (args.plays // len(valid) + 1))
+    evaluate = timed(lambda: game.evaluate(next(valid_iter)), args.plays)
+
+    return {
+        'generate_equalities': latency_summary(create),
+        'equality_error': latency_summary(error),
+        'evaluate': latency_summary(evaluate),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plays', type=int, default=2000)
+    parser.add_argument('--games', type=int, default=20, help='generate_equalities calls per configuration')
+    parser.add_argument('--eq-count', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    results = {}
+    for eq_length, operators in CONFIGS:
+        for method, summary in bench_config(eq_length, operators, args, rng).items():
+            case = f'{method}[{eq_length},{operators}]'
+            results[case] = summary
+            print(f'{case:36s} p50 {summary["p50_ms"] * 1000:9.1f} us  '
+                  f'p95 {summary["p95_ms"] * 1000:9.1f} us  p99 {summary["p99_ms"] * 1000:9.1f} us')
+
+    handle_baseline('game', results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Hot-query benchmark with and without the indexes from migration 0004.
+
+Creates a throwaway test database (Postgres, like production: Play/Game use
+ArrayField so SQLite cannot host the schema), seeds it with generate_series,
+then prints EXPLAIN plans and latencies for the play/status/games lookups with
+the indexes in place and after dropping them.
+
+    python -m benchmarks.bench_indexes [--plays 2000000] [--players 400] [--games 200]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import setup_django
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+
+from benchmarks.common import seed_database, test_database  # noqa: E402
+from nerdle_api.models import Game, Play, Player  # noqa: E402
+
+
+def hot_queries(players, games):
+    player_id = random.randint(1, players)
+    game_id = random.randint(1, games)
+    now = datetime.now(timezone.utc)
+    return {
+        'last_valid_play': Play.objects.filter(player=player_id, game=game_id,
+                                               results__isnull=False,
+                                               is_valid=True).order_by('-created')[:1],
+        'player_by_key': Player.objects.filter(key=f'K{player_id}')[:1],
+        'open_games': Game.objects.filter(start__lte=now, end__gte=now),
+    }
+
+
+def measure(label, players, games, samples):
+    print(f'\n=== {label} ===')
+    for name, qs in hot_queries(players, games).items():
+        print(f'-- {name}')
+        print(qs.explain(analyze=True))
+
+    timings = {}
+    for _ in range(samples):
+        for name, qs in hot_queries(players, games).items():
+            start = time.perf_counter()
+            list(qs)
+            timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+    for name, values in timings.items():
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f'{name:16s} p50 {statistics.median(values):8.3f} ms   p95 {p95:8.3f} ms')
+
+
+def drop_indexes():
+    with connection.schema_editor() as editor:
+        for model, name in ((Play, 'play_valid_latest_idx'), (Game, 'game_start_end_idx')):
+            index = next(i for i in model._meta.indexes if i.name == name)
+            editor.remove_index(model, index)
+        old_field = Player._meta.get_field('key')
+        new_field = old_field.clone()
+        new_field.set_attributes_from_name('key')
+        new_field._unique = False
+        new_field.model = Player
+        editor.alter_field(Player, old_field, new_field)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plays', type=int, default=2000000)
+    parser.add_argument('--players', type=int, default=400)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        start = time.perf_counter()
+        seed_database(args.players, args.games, args.plays)
+        print(f'Seeded {args.plays} plays in {time.perf_counter() - start:.1f}s')
+
+        measure('with indexes', args.players, args.games, args.samples)
+        drop_indexes()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        measure('without indexes', args.players, args.games, args.samples)
+
+if __name__ == '__main__':
+    main()
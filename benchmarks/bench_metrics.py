@@ -0,0 +1,60 @@
+"""Overhead of MetricsMiddleware and the @timed Game hooks.
+
+Runs in memory: wraps a view that validates and scores a guess, with and
+without the middleware, and times the @timed hooks outside a request.
+
+    python -m benchmarks.bench_metrics [--requests 20000]
+"""
+import argparse
+import time
+
+from benchmarks.common import setup_django
+
+setup_django()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.urls import ResolverMatch  # noqa: E402
+
+from nerdle_api.metrics import registry  # noqa: E402
+from nerdle_api.middleware import MetricsMiddleware  # noqa: E402
+from nerdle_api.models import Game  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    game = Game(id=1, eq_length=8, operators='+-*/', equalities=['12+35=47', '9*8-2=70'])
+
+    def view(request):
+        request.resolver_match = ResolverMatch(view, (), {}, route='api/play/')
+        if game.equality_error('12+35=47') is None:
+            game.evaluate('12+35=47')
+        return HttpResponse('ok')
+
+    request = RequestFactory().post('/api/play/')
+    middleware = MetricsMiddleware(view)
+
+    def run(handler):
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            handler(request)
+        return (time.perf_counter() - start) / args.requests * 1e6
+
+    run(view), run(middleware)  # calentamiento
+    bare = run(view)
+    instrumented = run(middleware)
+    print(f'view only:        {bare:8.2f} us/request')
+    print(f'with middleware:  {instrumented:8.2f} us/request  (+{instrumented - bare:.2f} us)')
+
+    registry.clear()
+    run(middleware)
+    start = time.perf_counter()
+    text = registry.render()
+    print(f'/metrics render:  {(time.perf_counter() - start) * 1e6:8.2f} us, {len(text.splitlines())} lines')
+
+
+if __name__ == '__main__':
+    main()
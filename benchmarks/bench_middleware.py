@@ -0,0 +1,82 @@
+"""Per-request overhead of the middleware stack on /api/ routes.
+
+Runs in memory through the WSGI handler with a trivial csrf_exempt view,
+once with Django's stock admin middlewares (the previous MIDDLEWARE) and
+once with settings.MIDDLEWARE, whose admin middlewares pass /api/ requests
+straight through. /admin/-style paths are timed too to show they keep the
+full stack.
+
+    python -m benchmarks.bench_middleware [--requests 5000]
+"""
+import argparse
+import time
+
+from benchmarks.common import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.urls import path  # noqa: E402
+from django.views.decorators.csrf import csrf_exempt  # noqa: E402
+
+
+STOCK_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+]
+
+
+@csrf_exempt
+def ping(request):
+    return JsonResponse({'finished': False, 'plays': 0, 'game': request.GET.get('game')})
+
+
+urlpatterns = [
+    path('api/game/status/', ping),
+    path('site/status/', ping),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    factory = RequestFactory()
+    paths = {'api': '/api/game/status/', 'site': '/site/status/'}
+
+    def start_response(status, headers):
+        pass
+
+    def run(handler, url):
+        environ = factory.get(url, {'game': 1, 'key': 'K1'}).environ
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            handler(dict(environ), start_response)
+        return (time.perf_counter() - start) / args.requests * 1e6
+
+    results = {}
+    for stack, middleware in (('stock', STOCK_MIDDLEWARE), ('light', settings.MIDDLEWARE)):
+        with override_settings(MIDDLEWARE=middleware, ROOT_URLCONF=__name__):
+            handler = WSGIHandler()
+            for name, url in paths.items():
+                run(handler, url)  # calentamiento
+                results[(stack, name)] = run(handler, url)
+
+    for name in paths:
+        stock, light = results[('stock', name)], results[('light', name)]
+        print(f'{name:5s} stock {stock:8.2f} us/request  light {light:8.2f} us/request  '
+              f'({stock - light:+.2f} us saved)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Scoring benchmark: quadratic reference scorer vs. scoring.score / score_many_numpy.
+
+Correctness against the reference scorer is covered by the property tests in
+nerdle_api/tests.py.
+
+    python -m benchmarks.bench_scoring [--plays N] [--targets T] [--length L]
+"""
+import argparse
+import random
+import timeit
+
+from nerdle_api import scoring
+
+
+def random_strings(rng, count, length, alphabet='0123456789+-*/='):
+    return [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plays', type=int, default=2000)
+    parser.add_argument('--targets', type=int, default=10)
+    parser.add_argument('--length', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    plays = random_strings(rng, args.plays, args.length)
+    targets = random_strings(rng, args.targets, args.length)
+    # Alfabetos pequeños fuerzan símbolos repetidos, el caso difícil del conteo
+    plays += random_strings(rng, args.plays, args.length, '12=')
+    targets += random_strings(rng, args.targets, args.length, '12=')
+
+    backends = [
+        ('reference', lambda: [[scoring.reference_score(p, t) for t in targets] for p in plays]),
+        ('score_many', lambda: scoring.score_many(plays, targets)),
+    ]
+    if scoring.np is not None:
+        backends.append(('score_many_numpy', lambda: scoring.score_many_numpy(plays, targets)))
+
+    cells = len(plays) * len(targets)
+    print(f'plays: {len(plays)}  targets: {len(targets)}  length: {args.length}')
+    for name, fn in backends:
+        elapsed = min(timeit.repeat(fn, number=1, repeat=3))
+        print(f'{name:18s} {elapsed * 1e6 / cells:8.3f} us/score')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Play storage: text[]/boolean[] arrays vs. the packed encoding (migration 0008).
+
+Creates a throwaway test database (Postgres), and for each eq_count inserts
+the same random plays into two scratch tables, one with the old ArrayField
+columns and one with bytea/bigint, reporting insert throughput (encoding
+included) and the resulting table size (heap + TOAST + indexes).
+
+    python -m benchmarks.bench_storage [--rows 200000] [--eq-counts 1,6,30]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, setup_django
+
+setup_django()
+
+from psycopg2.extras import execute_values  # noqa: E402
+
+from benchmarks.common import test_database  # noqa: E402
+from nerdle_api.packing import bools_to_mask, pack_results  # noqa: E402
+
+
+LAYOUTS = {
+    'array': ('results text[], eqs_state boolean[]', lambda results, state: (results, state)),
+    'packed': ('results bytea, eqs_state bigint', lambda results, state: (pack_results(results), bools_to_mask(state))),
+}
+
+COMMON_COLUMNS = ('id bigserial PRIMARY KEY, player_id integer, game_id integer, equality varchar(20), '
+                  'is_valid boolean, finished boolean, created timestamptz')
+
+
+def random_plays(rng, rows, eq_count, eq_length=8):
+    now = datetime.now(timezone.utc)
+    for i in range(rows):
+        results = [''.join(rng.choice('012') for _ in range(eq_length)) for _ in range(eq_count)]
+        state = [rng.random() < 0.3 for _ in range(eq_count)]
+        yield (rng.randint(1, 400), rng.randint(1, 200), '12+35=47', True, False, now), results, state
+
+
+def run_layout(cursor, name, eq_count, plays, batch_size):
+    columns, encode = LAYOUTS[name]
+    table = f'bench_play_{name}_{eq_count}'
+    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    cursor.execute(f'CREATE TABLE {table} ({COMMON_COLUMNS}, {columns})')
+
+    start = time.perf_counter()
+    for i in range(0, len(plays), batch_size):
+        values = [base + encode(results, state) for base, results, state in plays[i:i + batch_size]]
+        execute_values(cursor,
+                       f'INSERT INTO {table} (player_id, game_id, equality, is_valid, finished, created, '
+                       f'results, eqs_state) VALUES %s', values, page_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    cursor.execute(f'VACUUM ANALYZE {table}')
+    cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+    size = cursor.fetchone()[0]
+    cursor.execute(f'DROP TABLE {table}')
+    return {'rows_per_s': len(plays) / elapsed, 'bytes_per_row': size / len(plays), 'total_mb': size / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--eq-counts', default='1,6,30')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    with test_database() as connection:
+        # VACUUM no puede correr dentro de una transacción
+        connection.set_autocommit(True)
+        with connection.cursor() as cursor:
+            for eq_count in (int(c) for c in args.eq_counts.split(',')):
+                plays = list(random_plays(random.Random(args.seed), args.rows, eq_count))
+                for name in LAYOUTS:
+                    case = f'{name}_eq{eq_count}'
+                    results[case] = run_layout(cursor, name, eq_count, plays, args.batch_size)
+                    r = results[case]
+                    print(f'{case:12s} {r["rows_per_s"]:10.0f} rows/s  {r["bytes_per_row"]:7.1f} bytes/row  '
+                          f'{r["total_mb"]:8.1f} MB')
+
+    handle_baseline('storage', results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""GamesSummaryAdmin.changelist_view at classroom scale.
+
+Seeds a throwaway Postgres test database and renders the admin summary page,
+reporting latency and the number of SQL queries per render.
+
+    python -m benchmarks.bench_summary [--players 300] [--games 40] [--plays 200000]
+"""
+import argparse
+import time
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, latency_summary, setup_django
+
+setup_django()
+
+from django.contrib.admin.sites import site  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from benchmarks.common import seed_database, test_database  # noqa: E402
+from nerdle_api.models import GamesSummary  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--games', type=int, default=40)
+    parser.add_argument('--plays', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=10)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    with test_database():
+        seed_database(args.players, args.games, args.plays)
+        user = User.objects.create_superuser('bench', 'bench@example.com', 'bench-password')
+        model_admin = site._registry[GamesSummary]
+
+        latencies = []
+        queries = 0
+        for _ in range(args.repeat):
+            request = RequestFactory().get('/admin/nerdle_api/gamessummary/')
+            request.user = user
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                model_admin.changelist_view(request).render()
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries = len(ctx.captured_queries)
+
+    summary = latency_summary(latencies)
+    summary['queries'] = queries
+    print(f'changelist_view ({args.players} players x {args.games} games, {args.plays} plays): '
+          f'p50 {summary["p50_ms"]:.1f} ms  p95 {summary["p95_ms"]:.1f} ms  {queries} queries')
+
+    handle_baseline('summary', {'changelist_view': summary}, args)
+
+
+if __name__ == '__main__':
+    main()
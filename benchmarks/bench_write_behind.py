@@ -0,0 +1,106 @@
+"""Play latency at peak class load: synchronous inserts vs. write-behind.
+
+Every student of a class posts plays to /api/play/ at the same time (one
+thread and test client each) against a seeded throwaway Postgres test
+database. Runs once with PLAY_WRITE_BEHIND off and once on, reports latency
+percentiles per mode, and for write-behind how long the final flush takes and
+whether every play reached the database (Player.play_count).
+
+    python -m benchmarks.bench_write_behind [--students 60] [--plays 30] [--fsync]
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.common import add_baseline_arguments, handle_baseline, latency_summary, setup_django
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from benchmarks.common import seed_database, test_database  # noqa: E402
+from benchmarks.loadgen import random_guess  # noqa: E402
+from nerdle_api import write_behind  # noqa: E402
+from nerdle_api.models import Game, Play, Player  # noqa: E402
+
+
+def run_class(game, students, plays, seed):
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(students)
+
+    def student(i):
+        rng = random.Random(seed + i)
+        client = Client()
+        key = f'K{i + 1}'
+        barrier.wait()
+        for _ in range(plays):
+            start = time.perf_counter()
+            response = client.post('/api/play/', {'game': game.id, 'key': key,
+                                                  'equality': random_guess(rng, game.eq_length)})
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        connection.close()
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(students)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def reset(game):
+    Play.objects.filter(game=game).delete()
+    game.playergamestate_set.all().delete()
+    Player.objects.update(play_count=0)
+    cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=60)
+    parser.add_argument('--plays', type=int, default=30, help='Plays per student')
+    parser.add_argument('--fsync', action='store_true', help='fsync the journal on every play')
+    parser.add_argument('--seed', type=int, default=0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    with test_database(), tempfile.TemporaryDirectory() as journal:
+        seed_database(args.students, 1, 0)
+        game = Game.objects.get()
+        game.create_equalities()
+
+        common = {'PLAY_RATE_LIMIT': 0, 'PLAY_DEDUP_SECONDS': 0, 'PLAY_JOURNAL_DIR': journal,
+                  'PLAY_JOURNAL_FSYNC': args.fsync}
+        for mode, deferred in (('sync', False), ('write_behind', True)):
+            reset(game)
+            with override_settings(PLAY_WRITE_BEHIND=deferred, **common):
+                latencies, errors, elapsed = run_class(game, args.students, args.plays, args.seed)
+                flush_start = time.perf_counter()
+                write_behind.shutdown()
+                flush_ms = (time.perf_counter() - flush_start) * 1000
+
+            summary = latency_summary(latencies)
+            summary['rps'] = len(latencies) / elapsed
+            summary['errors'] = len(errors)
+            counted = Player.objects.aggregate(total=Sum('play_count'))['total']
+            results[mode] = summary
+            print(f'{mode:12s} p50 {summary["p50_ms"]:7.2f}  p95 {summary["p95_ms"]:7.2f}  '
+                  f'p99 {summary["p99_ms"]:7.2f} ms  {summary["rps"]:7.1f} req/s  '
+                  f'{len(errors)} errors  {counted}/{len(latencies)} plays counted'
+                  + (f'  (final flush {flush_ms:.1f} ms)' if deferred else ''))
+
+    handle_baseline('write-behind', results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import json
+import os
+import statistics
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+
+# Métricas donde más es mejor; el resto (latencias, consultas) menos es mejor
+HIGHER_IS_BETTER = ('rps', 'per_s')
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nerdle.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    # Base de datos desechable (Postgres: el esquema usa ArrayField)
+    from django.db import connection
+
+    if connection.vendor != 'postgresql':
+        raise SystemExit('This benchmark needs PostgreSQL (ArrayField columns).')
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_database(players, games, plays):
+    # Jugadores K1..Kn, juegos consecutivos de un día (el último abierto) y
+    # jugadas repartidas entre ellos; 1 de cada 5 jugadas es inválida.
+    from django.db import connection
+
+    from nerdle_api.models import Game, Play, Player
+    from nerdle_api.packing import bools_to_mask, pack_results
+
+    now = datetime.now(timezone.utc)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Player._meta.db_table} (name, key, play_count) '
+            "SELECT 'player ' || i, 'K' || i, 0 FROM generate_series(1, %s) i", [players])
+        cursor.execute(
+            f'INSERT INTO {Game._meta.db_table} '
+            '(start, "end", eq_length, eq_count, operators, equalities, resettable, created, modified) '
+            "SELECT %s + i * interval '1 day', %s + (i + 1) * interval '1 day', 8, 1, '+-*/', "
+            "ARRAY['12+35=47'], true, %s, %s FROM generate_series(1, %s) i",
+            [now - timedelta(days=games), now - timedelta(days=games), now, now, games])
+        cursor.execute(
+            f'INSERT INTO {Play._meta.db_table} '
+            '(player_id, game_id, equality, is_valid, error_type, results, eqs_state, finished, created) '
+            'SELECT p.id, g.id, %s, (i %% 5) <> 0, NULL, '
+            'CASE WHEN (i %% 5) <> 0 THEN %s::bytea END, '
+            'CASE WHEN (i %% 5) <> 0 THEN %s END, false, '
+            "%s - i * interval '1 second' "
+            'FROM generate_series(1, %s) i '
+            f'JOIN {Player._meta.db_table} p ON p.id = 1 + (i * 7919) %% %s '
+            f'JOIN {Game._meta.db_table} g ON g.id = 1 + (i * 104729) %% %s',
+            ['12+35=47', pack_results(['20011022']), bools_to_mask([False]), now, plays, players, games])
+        cursor.execute('ANALYZE')
+
+
+def latency_summary(latencies_ms):
+    values = sorted(latencies_ms)
+    if not values:
+        return {'count': 0}
+
+    def pick(p):
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    return {
+        'count': len(values),
+        'mean_ms': statistics.fmean(values),
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+    }
+
+
+def baseline_path(name):
+    return BASELINE_DIR / f'{name}.json'
+
+
+def save_baseline(name, results):
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = baseline_path(name)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True))
+    print(f'Baseline saved to {path}')
+
+
+def compare_baseline(name, results, tolerance=0.15):
+    # Devuelve la lista de regresiones respecto al baseline guardado
+    path = baseline_path(name)
+    if not path.exists():
+        print(f'No baseline at {path}')
+        return []
+
+    baseline = json.loads(path.read_text())
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(case, {}).get(metric)
+            if metric == 'count' or not isinstance(old, (int, float)) or not isinstance(value, (int, float)) or old == 0:
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            if worse > tolerance:
+                regressions.append(f'{case}.{metric}: {old:.4g} -> {value:.4g} ({change:+.0%})')
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Guardar los resultados como baseline en benchmarks/baselines/')
+    parser.add_argument('--compare', action='store_true',
+                        help='Comparar contra el baseline guardado y fallar si hay regresiones')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Empeoramiento relativo permitido antes de marcar regresión')
+
+
+def handle_baseline(name, results, args):
+    if args.save_baseline:
+        save_baseline(name, results)
+    if args.compare:
+        regressions = compare_baseline(name, results, args.tolerance)
+        for r in regressions:
+            print(f'REGRESSION {r}')
+        if regressions:
+            sys.exit(1)
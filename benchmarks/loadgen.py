@@ -0,0 +1,193 @@
+"""Asyncio load generator for the public API (no third-party dependencies).
+
+Opens N keep-alive connections against a running server and fires requests
+for a fixed duration, then reports throughput and latency percentiles.
+To compare the sync and async deployments, run it once against each:
+
+    gunicorn nerdle.wsgi -w 4 -b :8000
+    ASYNC_API=True gunicorn nerdle.asgi:application -w 4 -k uvicorn.workers.UvicornWorker -b :8001
+
+    python -m benchmarks.loadgen --port 8000 --game 1 --key K1 --concurrency 500 --label sync
+    python -m benchmarks.loadgen --port 8001 --game 1 --key K1 --concurrency 500 --label async
+
+Add --save-baseline to store the run in benchmarks/baselines/load-<label>.json
+and --compare on later runs to fail on latency/throughput regressions.
+"""
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import urlencode
+
+from benchmarks.common import add_baseline_arguments, handle_baseline
+from nerdle_api.expressions import resolve
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Connection:
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = urlencode(body).encode() if body is not None else b''
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}', 'Connection: keep-alive']
+        if body is not None:
+            headers += ['Content-Type: application/x-www-form-urlencoded', f'Content-Length: {len(payload)}']
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed')
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            name = name.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+        body = await self.reader.readexactly(length) if length else b''
+        if close:
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def random_guess(rng, eq_length, operators='+-*/', invalid_ratio=0.15):
+    # Mezcla realista: la mayoría son igualdades correctas (como las de un
+    # solver), el resto se deja con el lado derecho al azar y suele ser inválido.
+    left = ''
+    for _ in range(100):
+        left = str(rng.randint(1, 99))
+        for _ in range(rng.randint(0, 2)):
+            left += rng.choice(operators.replace('^', '') or '+') + str(rng.randint(1, 9))
+        right = eq_length - len(left) - 1
+        if right <= 0:
+            continue
+        if rng.random() < invalid_ratio:
+            return left + '=' + ''.join(rng.choice('0123456789') for _ in range(right))
+        res = resolve(left)
+        if isinstance(res, int) and len(str(res)) == right:
+            return f'{left}={res}'
+    return (left + '=' + '0' * eq_length)[:eq_length]
+
+
+def scenario_requests(args, rng):
+    # Distribución por defecto: polling de juegos/estado y jugadas
+    key = rng.choice(args.key)
+    roll = rng.random()
+    if roll < args.play_ratio:
+        return 'play', 'POST', '/api/play/', {'game': args.game, 'key': key,
+                                               'equality': random_guess(rng, args.eq_length)}
+    if roll < args.play_ratio + args.status_ratio:
+        return 'status', 'GET', '/api/game/status/?' + urlencode({'game': args.game, 'key': key}), None
+    return 'games', 'GET', '/api/games/', None
+
+
+async def worker(args, deadline, stats, seed):
+    rng = random.Random(seed)
+    conn = Connection(args.host, args.port)
+    try:
+        while time.perf_counter() < deadline:
+            name, method, path, body = scenario_requests(args, rng)
+            start = time.perf_counter()
+            try:
+                status, _ = await conn.request(method, path, body)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                stats.setdefault(name, {'latencies': [], 'errors': 0, 'throttled': 0})['errors'] += 1
+                continue
+            entry = stats.setdefault(name, {'latencies': [], 'errors': 0, 'throttled': 0})
+            if status == 429:
+                # Rate limit / dedup: no se atendió, y su latencia no es la del camino real
+                entry['throttled'] += 1
+                continue
+            entry['latencies'].append((time.perf_counter() - start) * 1000)
+            if status >= 500:
+                entry['errors'] += 1
+    finally:
+        conn.close()
+
+
+async def run(args):
+    stats = {}
+    deadline = time.perf_counter() + args.duration
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(args, deadline, stats, args.seed + i) for i in range(args.concurrency)))
+    return stats, time.perf_counter() - start
+
+
+def summarize(stats, elapsed):
+    summary = {}
+    for name, entry in sorted(stats.items()):
+        latencies = entry['latencies']
+        summary[name] = {
+            'requests': len(latencies),
+            'errors': entry['errors'],
+            'throttled': entry['throttled'],
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+        }
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--game', required=True)
+    parser.add_argument('--key', action='append', required=True, help='Player key (repeatable)')
+    parser.add_argument('--eq-length', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--play-ratio', type=float, default=0.6)
+    parser.add_argument('--status-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', default='')
+    add_baseline_arguments(parser)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    stats, elapsed = asyncio.run(run(args))
+    summary = summarize(stats, elapsed)
+
+    total = sum(s['requests'] for s in summary.values())
+    throttled = sum(s['throttled'] for s in summary.values())
+    print(f'{args.label or "run"}: {args.concurrency} clients, {elapsed:.1f}s, {total / elapsed:.1f} req/s, '
+          f'{throttled} throttled (429)')
+    for name, s in summary.items():
+        print(f'  {name:8s} {s["requests"]:7d} req {s["errors"]:5d} err {s["throttled"]:5d} 429 {s["rps"]:8.1f} req/s  '
+              f'p50 {s["p50_ms"]:7.1f}  p95 {s["p95_ms"]:7.1f}  p99 {s["p99_ms"]:7.1f} ms')
+
+    handle_baseline(f'load-{args.label}' if args.label else 'load', summary, args)
+
+
+if __name__ == '__main__':
+    main()
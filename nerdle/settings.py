@@ -35,16 +35,51 @@ INSTALLED_APPS = [
     'nerdle_api.apps.NerdleApiConfig',
 ]
 
+# Sesión, CSRF, usuario, mensajes y X-Frame-Options son para el admin: en
+# LIGHT_MIDDLEWARE_PATHS (salvo LIGHT_MIDDLEWARE_EXCLUDE) las versiones de
+# nerdle_api.middleware pasan de largo. La exportación acepta staff con sesión.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'nerdle_api.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'nerdle_api.middleware.CsrfViewMiddleware',
+    'nerdle_api.middleware.AuthenticationMiddleware',
+    'nerdle_api.middleware.MessageMiddleware',
+    'nerdle_api.middleware.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
+LIGHT_MIDDLEWARE_PATHS = ('/api/', '/metrics')
+LIGHT_MIDDLEWARE_EXCLUDE = ('/api/export/',)
+
+# Métricas por ruta (latencia, SQL, tiempo en Game) expuestas en /metrics
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+METRICS_SLOW_REQUEST_MS = env.int('METRICS_SLOW_REQUEST_MS', default=0)
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')
+
+# /api/play/: jugadas por minuto por (key, juego) y ráfaga permitida (token
+# bucket en el caché; Game/Tournament.play_rate_limit lo sobrescriben, 0 lo
+# desactiva) y segundos durante los que una jugada idéntica recibe la misma respuesta
+PLAY_RATE_LIMIT = env.int('PLAY_RATE_LIMIT', default=120)
+PLAY_RATE_BURST = env.int('PLAY_RATE_BURST', default=20)
+PLAY_DEDUP_SECONDS = env.int('PLAY_DEDUP_SECONDS', default=5)
+
+# Write-behind de /api/play/: la respuesta sale del estado en caché y las
+# jugadas se insertan por lotes cada PLAY_FLUSH_INTERVAL segundos (o al juntar
+# PLAY_FLUSH_BATCH). Antes se escriben en un journal en PLAY_JOURNAL_DIR, que
+# debe sobrevivir al proceso; PLAY_JOURNAL_FSYNC además lo baja a disco en
+# cada jugada (protege de una caída de la máquina, a costa de latencia).
+# Requiere un caché compartido (REDIS_URL); ver nerdle_api.E001.
+PLAY_WRITE_BEHIND = env.bool('PLAY_WRITE_BEHIND', default=False)
+PLAY_JOURNAL_DIR = env.str('PLAY_JOURNAL_DIR', default=os.path.join(BASE_DIR, 'play_journal'))
+PLAY_FLUSH_INTERVAL = env.float('PLAY_FLUSH_INTERVAL', default=0.5)
+PLAY_FLUSH_BATCH = env.int('PLAY_FLUSH_BATCH', default=500)
+PLAY_JOURNAL_FSYNC = env.bool('PLAY_JOURNAL_FSYNC', default=False)
+
+# Bearer token para /api/export/plays/ (además del staff con sesión en el admin)
+EXPORT_TOKEN = env.str('EXPORT_TOKEN', default='')
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'nerdle_api.middleware.MetricsMiddleware')
 
 ROOT_URLCONF = 'nerdle.urls'
 
@@ -67,10 +102,42 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'nerdle.wsgi.application'
 
+# Vistas async de la API (games, play, status, reset). Sólo tienen sentido bajo
+# ASGI; en Heroku basta con definir:
+#   ASYNC_API=True WEB_APP=nerdle.asgi:application GUNICORN_CMD_ARGS="-k uvicorn.workers.UvicornWorker"
+# Su trabajo de BD corre en un pool de ASYNC_DB_THREADS threads por worker
+# (nerdle_api.db_threads), cuyas conexiones duran ASYNC_DB_CONN_MAX_AGE segundos.
+ASYNC_API = env.bool('ASYNC_API', default=False)
+ASYNC_DB_THREADS = env.int('ASYNC_DB_THREADS', default=8)
+ASYNC_DB_CONN_MAX_AGE = env.int('ASYNC_DB_CONN_MAX_AGE', default=600)
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Conexiones a Postgres. Por defecto cada worker mantiene su conexión
+# DATABASE_CONN_MAX_AGE segundos (0 = una conexión por request) y la verifica
+# antes de reutilizarla (CONN_HEALTH_CHECKS). Bajo ASGI Django no reutiliza
+# conexiones entre requests, así que ahí el default es 0 y conviene un pooler;
+# los threads de ASYNC_DB_THREADS sí las mantienen ASYNC_DB_CONN_MAX_AGE.
+# DATABASE_POOLER=pgbouncer: DATABASE_URL apunta a un pgbouncer en modo
+# transaction (p.ej. el buildpack de Heroku, que escucha en localhost sin
+# SSL); se desactivan los cursores server-side, que no sobreviven entre
+# transacciones (QuerySet.iterator() trae el resultado completo; las
+# exportaciones paginan por id y no dependen de ellos).
+DATABASE_POOLER = env.str('DATABASE_POOLER', default='')
+DATABASE_CONN_MAX_AGE = env.int('DATABASE_CONN_MAX_AGE', default=0 if ASYNC_API else 600)
+DATABASE_CONN_HEALTH_CHECKS = env.bool('DATABASE_CONN_HEALTH_CHECKS', default=True)
+
+# Conexiones que abre la aplicación: una por thread (--threads WEB_THREADS en
+# el Procfile, o ASYNC_DB_THREADS bajo ASGI) de cada worker de gunicorn
+# (WEB_CONCURRENCY lo define Heroku).
+# El check nerdle_api.W001 avisa si supera DATABASE_MAX_CONNECTIONS (el límite
+# del plan de Postgres o el default_pool_size del pgbouncer; 0 = no comprobar).
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=1)
+WEB_THREADS = env.int('WEB_THREADS', default=1)
+DATABASE_MAX_CONNECTIONS = env.int('DATABASE_MAX_CONNECTIONS', default=0)
+
 # Database
 DATABASES = {
     'default': {
@@ -79,21 +146,46 @@ DATABASES = {
         'USER': env.str('POSTGRES_USER', default='nerdle'),
         'PASSWORD': env.str('POSTGRES_PASS', default=''),
         'HOST': '',
-        'PORT': 5432
+        'PORT': 5432,
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DATABASE_CONN_HEALTH_CHECKS,
     }
 }
 
-MAX_CONN_AGE = 600
-
 if "DATABASE_URL" in os.environ:
     # Configure Django for DATABASE_URL environment variable.
     DATABASES["default"] = dj_database_url.config(
-        conn_max_age=MAX_CONN_AGE, ssl_require=True)
+        conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+        ssl_require=DATABASE_POOLER != 'pgbouncer')
 
     # Enable test database if found in CI environment.
     if "CI" in os.environ:
         DATABASES["default"]["TEST"] = DATABASES["default"]
 
+if DATABASE_POOLER == 'pgbouncer':
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+
+# Cache compartido (juegos activos, etc.). En producción apuntar REDIS_URL a un
+# Redis para que todos los workers de gunicorn vean las mismas entradas.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nerdle',
+        # Con el default (300) las celdas de standings, los baldes y las
+        # respuestas de jugadas se desalojan entre sí
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('LOCMEM_CACHE_MAX_ENTRIES', default=100000),
+        },
+    }
+}
+
+if "REDIS_URL" in os.environ:
+    CACHES["default"] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ["REDIS_URL"],
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -134,6 +226,22 @@ STATICFILES_FINDERS = [
     'django.contrib.staticfiles.finders.AppDirectoriesFinder',
 ]
 
+# Índice precalculado de igualdades (manage.py build_equation_index). Tiene
+# que estar en el disco de los dynos web: en Heroku se arma con el slug
+# (bin/post_compile, configuraciones de EQUATION_INDEX_CONFIGS); el disco de la
+# fase release no se comparte. Sin índice se enumera o se usa el generador.
+EQUATION_INDEX_DIR = env.str('EQUATION_INDEX_DIR', default=os.path.join(BASE_DIR, 'equation_index'))
+EQUATION_INDEX_CONFIGS = env.list('EQUATION_INDEX_CONFIGS', default=['5:+-', '8:+-*/'])
+
+# manage.py archive_plays mueve a ArchivedPlay las jugadas de juegos terminados
+# hace más de estos días
+PLAY_ARCHIVE_RETENTION_DAYS = env.int('PLAY_ARCHIVE_RETENTION_DAYS', default=30)
+
+# Pool de igualdades pregeneradas (manage.py refill_equation_pool --loop): se
+# rellena hasta TARGET cuando quedan menos de LOW_WATER disponibles.
+EQUATION_POOL_LOW_WATER = env.int('EQUATION_POOL_LOW_WATER', default=100)
+EQUATION_POOL_TARGET = env.int('EQUATION_POOL_TARGET', default=500)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -13,16 +13,30 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 
-from nerdle_api.views import NerdleGamesView, NerdlePlayView, NerdleResetView, NerdleStatusView
+from nerdle_api.views import NerdleGamesView, NerdlePlayView, NerdleResetView, NerdleStatusView, \
+    NerdleStandingsView, NerdlePlayBatchView, NerdlePlayExportView, MetricsView
+
+if settings.ASYNC_API:
+    from nerdle_api.async_views import AsyncNerdleGamesView as NerdleGamesView, \
+        AsyncNerdlePlayView as NerdlePlayView, \
+        AsyncNerdleResetView as NerdleResetView, \
+        AsyncNerdleStatusView as NerdleStatusView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/games/', csrf_exempt(NerdleGamesView.as_view())),
     path('api/play/', csrf_exempt(NerdlePlayView.as_view())),
+    path('api/play/batch/', csrf_exempt(NerdlePlayBatchView.as_view())),
     path('api/game/status/', csrf_exempt(NerdleStatusView.as_view())),
     path('api/reset/', csrf_exempt(NerdleResetView.as_view())),
+    path('api/tournament/<int:tournament_id>/standings/', csrf_exempt(NerdleStandingsView.as_view())),
+    path('api/export/plays/', NerdlePlayExportView.as_view()),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics', MetricsView.as_view()))
@@ -1,8 +1,17 @@
 import random
 
 from django.contrib import admin
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from nerdle_api.models import Game, Player, Play, Tournament, GamesSummary
+from nerdle_api.equation_index import get_index, operators_key
+from nerdle_api.game_cache import invalidate_game
+from nerdle_api.models import ArchivedPlay, Game, Player, Play, PlayerGameState, PooledEquation, Tournament, \
+    GamesSummary
+from nerdle_api.solver import replay_game
+from nerdle_api.standings import build_summary, rank
 
 
 @admin.register(Player)
@@ -14,17 +23,72 @@ class PlayerAdmin(admin.ModelAdmin):
 class PlayAdmin(admin.ModelAdmin):
     list_display = ('game', 'player', 'equality', 'is_valid', 'error_type', 'created', 'finished')
     list_filter = ('finished', 'game', 'error_type', 'player')
+    list_select_related = ('game', 'player')
+
+
+@admin.register(ArchivedPlay)
+class ArchivedPlayAdmin(admin.ModelAdmin):
+    list_display = ('game', 'player', 'equality', 'is_valid', 'error_type', 'results', 'created', 'finished')
+    list_filter = ('finished', 'error_type')
+    list_select_related = ('game', 'player')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PlayerGameState)
+class PlayerGameStateAdmin(admin.ModelAdmin):
+    list_display = ('player', 'game', 'plays_count', 'finished')
+    list_filter = ('finished', 'game')
 
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ('id', 'operators', 'eq_count', 'eq_length', 'join_equations', 'resettable', 'end')
+    list_display = ('id', 'operators', 'eq_count', 'eq_length', 'join_equations', 'resettable', 'end', 'analytics')
     list_filter = ('tournaments',)
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         if obj.equalities is None or len(obj.equalities) != obj.eq_count:
             obj.create_equalities()
+        invalidate_game(obj.id)
+
+    def get_urls(self):
+        return [
+            path('<int:game_id>/analytics/', self.admin_site.admin_view(self.analytics_view),
+                 name='nerdle_api_game_analytics'),
+        ] + super().get_urls()
+
+    @admin.display(description='Análisis')
+    def analytics(self, obj):
+        return format_html('<a href="{}">candidatas</a>', reverse('admin:nerdle_api_game_analytics', args=[obj.id]))
+
+    def analytics_view(self, request, game_id):
+        # Cuántas candidatas eliminó cada jugada, con el solver de referencia
+        game = get_object_or_404(Game, id=game_id)
+        # Sin índice habría que enumerar el espacio completo dentro del proceso
+        # web y dejarlo en memoria: se pide construirlo antes
+        index_missing = get_index(game.eq_length, operators_key(game.operators)) is None
+        # Caché de aperturas local a la petición: el del módulo no se libera nunca
+        replays = {} if index_missing else replay_game(game, processes=1, cache={})
+        context = dict(
+            self.admin_site.each_context(request),
+            title=f'Análisis del juego {game.short_name}',
+            game=game,
+            index_missing=index_missing,
+            operators=operators_key(game.operators),
+            replays=[(name, rows) for (name, _), rows in sorted(replays.items())],
+        )
+        return TemplateResponse(request, 'admin/game_analytics.html', context)
+
+
+@admin.register(PooledEquation)
+class PooledEquationAdmin(admin.ModelAdmin):
+    list_display = ('equality', 'eq_length', 'operators', 'drawn', 'game', 'created')
+    list_filter = ('drawn', 'eq_length', 'operators')
 
 
 @admin.register(Tournament)
@@ -48,27 +112,11 @@ class GamesSummaryAdmin(admin.ModelAdmin):
         except (AttributeError, KeyError):
             return response
 
-        response.context_data['games'] = list(qs.order_by('id'))
+        games = list(qs.order_by('id'))
+        response.context_data['games'] = games
 
         players = Player.objects.all().order_by('name')
-
-        players_values = []
-        for p in players:
-            p_vals = {'name': p.name, 'games': []}
-            p_sum = 0
-            for g in qs.order_by('id'):
-                p_plays = p.game_plays_count(g)
-                p_sum += p_plays
-
-                p_last = p.last_valid_play(g)
-
-                p_vals['games'].append({'plays': p_plays,
-                                        'finished': p_last.finished if p_last is not None else False})
-            p_vals['total'] = p_sum
-            p_vals['fs'] = len([g for g in p_vals['games'] if g['finished']])
-            players_values.append(p_vals)
-
-        players_values.sort(key=lambda x: (-x['fs'], x['total']))
+        players_values = rank(build_summary(games, players), [g.id for g in games])
 
         response.context_data['players_values'] = players_values
 
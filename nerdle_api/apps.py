@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NerdleApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nerdle_api'
+
+    def ready(self):
+        from nerdle_api import checks, signals  # noqa: F401
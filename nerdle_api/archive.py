@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from nerdle_api.models import ArchivedPlay, Game, Play
+
+
+def archive_cutoff(retention_days=None):
+    # Se archivan las jugadas de juegos cuyo 'end' pasó hace más de retention_days
+    if retention_days is None:
+        retention_days = getattr(settings, 'PLAY_ARCHIVE_RETENTION_DAYS', 30)
+    return datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+
+def archivable_plays(cutoff):
+    return Play.objects.filter(game__end__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=5000):
+    # Una transacción corta por lote: copia al archivo y borra de Play. Las filas
+    # bloqueadas por otro proceso se saltan y quedan para el próximo lote.
+    with transaction.atomic():
+        plays = list(archivable_plays(cutoff)
+                     .select_for_update(skip_locked=True, of=('self',))
+                     .order_by('id')[:batch_size])
+        if not plays:
+            return 0
+        ArchivedPlay.objects.bulk_create([ArchivedPlay.from_play(p) for p in plays], ignore_conflicts=True)
+        # PlayerGameState.last_play pasa a NULL (SET_NULL); el resto del estado se mantiene
+        Play.objects.filter(id__in=[p.id for p in plays]).delete()
+    return len(plays)
+
+
+def archived_games():
+    # Un probe por juego sobre el índice de ArchivedPlay.game, sin recorrer el archivo
+    return Game.objects.filter(Exists(ArchivedPlay.objects.filter(game=OuterRef('pk'))))
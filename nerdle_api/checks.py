@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+def expected_connections():
+    # Una conexión por thread de cada worker (bajo ASGI, los de db_threads),
+    # más el flusher de write_behind
+    if getattr(settings, 'ASYNC_API', False):
+        threads = getattr(settings, 'ASYNC_DB_THREADS', 8)
+    else:
+        threads = getattr(settings, 'WEB_THREADS', 1)
+    per_worker = threads + (1 if getattr(settings, 'PLAY_WRITE_BEHIND', False) else 0)
+    return getattr(settings, 'WEB_CONCURRENCY', 1) * per_worker
+
+
+@register()
+def check_connection_budget(app_configs, **kwargs):
+    limit = getattr(settings, 'DATABASE_MAX_CONNECTIONS', 0)
+    expected = expected_connections()
+    if limit and expected > limit:
+        return [Warning(
+            f'Los workers pueden abrir {expected} conexiones a Postgres y el límite es {limit}',
+            hint='Bajar WEB_CONCURRENCY/WEB_THREADS o usar DATABASE_POOLER=pgbouncer '
+                 'con un default_pool_size menor que el límite',
+            id='nerdle_api.W001',
+        )]
+    return []
+
+
+# Backends cuyo contenido no se comparte entre procesos
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def process_local_cache():
+    return settings.CACHES.get('default', {}).get('BACKEND') in LOCAL_CACHE_BACKENDS
+
+
+@register()
+def check_write_behind_cache(app_configs, **kwargs):
+    # El estado (jugador, juego) y su lock viven en el caché: si no es
+    # compartido, cada worker juega sobre su propia copia. Desde aquí no se
+    # sabe cuántos workers levanta gunicorn, así que no basta con mirar
+    # WEB_CONCURRENCY.
+    if not getattr(settings, 'PLAY_WRITE_BEHIND', False):
+        return []
+    if process_local_cache():
+        backend = settings.CACHES['default']['BACKEND']
+        return [Error(
+            f'PLAY_WRITE_BEHIND necesita un caché compartido entre workers y el default es {backend}',
+            hint='Configurar REDIS_URL o desactivar PLAY_WRITE_BEHIND',
+            id='nerdle_api.E001',
+        )]
+    return []
@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+# Pool acotado de threads para el trabajo de BD de las vistas async. Con
+# sync_to_async(thread_sensitive=True) Django usa un thread por request
+# (ThreadSensitiveContext), que abre y cierra su propia conexión; aquí cada
+# worker tiene a lo más ASYNC_DB_THREADS threads y cada uno reutiliza su
+# conexión ASYNC_DB_CONN_MAX_AGE segundos (con CONN_HEALTH_CHECKS, como en
+# WSGI). Sólo sirve para funciones que manejan su propia conexión y
+# transacción: no pueden depender de estado del thread del request.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='db')
+    return _executor
+
+
+def in_db_thread(func):
+    def run(*args, **kwargs):
+        # Igual que request_started/request_finished en WSGI, pero por llamada
+        close_old_connections()
+        fresh = [conn for conn in connections.all() if conn.connection is None]
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # CONN_MAX_AGE es 0 bajo ASGI (los threads por request no se
+            # reutilizan); las conexiones del pool viven más
+            for conn in fresh:
+                if conn.connection is not None:
+                    conn.close_at = time.monotonic() + settings.ASYNC_DB_CONN_MAX_AGE
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=executor())
@@ -0,0 +1,170 @@
+import mmap
+import os
+import random
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+from django.conf import settings
+
+from nerdle_api.expressions import resolve
+from nerdle_api.validation import check_equality
+
+
+INDEX_SUFFIX = '.eqidx'
+
+# Evaluador sin caché: la enumeración recorre cientos de miles de prefijos
+# distintos y sólo ensuciaría el LRU que usan las jugadas.
+_resolve = resolve.__wrapped__
+
+
+def index_dir():
+    return Path(getattr(settings, 'EQUATION_INDEX_DIR', Path(settings.BASE_DIR) / 'equation_index'))
+
+
+def operators_key(operators):
+    return ''.join(sorted(set(operators)))
+
+
+def index_path(eq_length, operators, directory=None):
+    directory = Path(directory) if directory is not None else index_dir()
+    key = operators_key(operators).encode().hex()
+    return directory / f'{eq_length}_{key}{INDEX_SUFFIX}'
+
+
+def enumerate_equations(eq_length, operators, first_digit=None):
+    # Recorre el mismo árbol que Game.__operation_recursive, pero completo:
+    # después de un 0 sólo viene operador, no se divide (ni módulo) por un
+    # número que parta en 0 y hay a lo más un '^'.
+    operators = operators_key(operators)
+    digits = [str(d) for d in range(10)]
+    stack = list(digits) if first_digit is None else [str(first_digit)]
+    while stack:
+        operation = stack.pop()
+        res = str(_resolve(operation))
+        spaces_left = eq_length - (len(operation) + len(res) + 1)
+
+        if spaces_left == 0:
+            equality = f'{operation}={res}'
+            if check_equality(equality, eq_length, operators).is_valid:
+                yield equality
+            continue
+        if spaces_left < 0 or (spaces_left == 1 and operation[-1] == '0'):
+            continue
+        if spaces_left == 1 or operation[-1] != '0':
+            stack.extend(operation + d for d in digits)
+        if spaces_left == 1:
+            continue
+        for o in operators:
+            if o == '^' and '^' in operation:
+                continue
+            for d in digits:
+                if o in '/%' and d == '0':
+                    continue
+                stack.append(f'{operation}{o}{d}')
+
+
+def _enumerate_prefix(args):
+    eq_length, operators, first_digit = args
+    return [e.encode('ascii') for e in enumerate_equations(eq_length, operators, first_digit)]
+
+
+def build_index(eq_length, operators, directory=None, processes=None):
+    path = index_path(eq_length, operators, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    jobs = [(eq_length, operators, d) for d in range(10)]
+    if processes == 1:
+        chunks = map(_enumerate_prefix, jobs)
+    else:
+        with Pool(processes) as pool:
+            chunks = pool.map(_enumerate_prefix, jobs)
+
+    equalities = sorted(e for chunk in chunks for e in chunk)
+
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(b''.join(equalities))
+    os.replace(tmp_path, path)
+    _loaded.clear()
+    _missing.clear()
+    return path, len(equalities)
+
+
+class EquationIndex:
+    """Todas las igualdades válidas de una configuración (eq_length, operators).
+
+    Se guardan ordenadas como registros ASCII de largo fijo en un archivo que
+    se mapea en memoria, así un muestreo es O(1) y una búsqueda O(log n).
+    """
+
+    def __init__(self, path, eq_length):
+        self.path = Path(path)
+        self.eq_length = eq_length
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._count = size // eq_length
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start = i * self.eq_length
+        return self._mmap[start:start + self.eq_length].decode('ascii')
+
+    def __contains__(self, equality):
+        if len(equality) != self.eq_length:
+            return False
+        target = equality.encode('ascii', 'replace')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * self.eq_length
+            record = self._mmap[start:start + self.eq_length]
+            if record < target:
+                lo = mid + 1
+            elif record > target:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def as_array(self):
+        # Matriz numpy (N, eq_length) de bytes ASCII sobre el mmap, sin copiar
+        import numpy as np
+        return np.frombuffer(self._mmap, dtype=np.uint8).reshape(self._count, self.eq_length)
+
+    def sample(self, k, rng=random):
+        if self._count == 0:
+            return []
+        if k <= self._count:
+            positions = rng.sample(range(self._count), k)
+        else:
+            positions = [rng.randrange(self._count) for _ in range(k)]
+        return [self[i] for i in positions]
+
+
+# Cada cuánto volver a buscar en disco un índice que no existía
+INDEX_RECHECK_SECONDS = 60
+
+_loaded = {}
+_missing = {}
+
+
+def get_index(eq_length, operators):
+    config = (eq_length, operators)
+    index = _loaded.get(config)
+    if index is None:
+        now = time.monotonic()
+        if now - _missing.get(config, -INDEX_RECHECK_SECONDS) < INDEX_RECHECK_SECONDS:
+            return None
+        path = index_path(eq_length, operators)
+        if not path.exists():
+            _missing[config] = now
+            return None
+        _missing.pop(config, None)
+        index = _loaded[config] = EquationIndex(path, eq_length)
+    return index
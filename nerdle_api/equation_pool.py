@@ -0,0 +1,93 @@
+import os
+import random
+from multiprocessing import Pool
+
+from django.conf import settings
+
+from nerdle_api.equation_index import operators_key
+from nerdle_api.models import Game, PooledEquation
+
+
+def pool_low_water():
+    return getattr(settings, 'EQUATION_POOL_LOW_WATER', 100)
+
+
+def pool_target():
+    return getattr(settings, 'EQUATION_POOL_TARGET', 500)
+
+
+def pool_configs():
+    # Configuraciones (eq_length, operators) de los juegos existentes
+    return sorted({(length, operators_key(ops))
+                   for length, ops in Game.objects.values_list('eq_length', 'operators').distinct()})
+
+
+def _generate_chunk(args):
+    # Corre en un proceso aparte: no toca la BD, sólo el índice o el generador
+    eq_length, operators, count, seed = args
+    random.seed(seed)
+    return Game(eq_length=eq_length, operators=operators).generate_equalities(count)
+
+
+def generate_many(requests, processes=None, seed=None, exclude=()):
+    # requests: [(eq_length, operators, count)]. Reparte cada pedido en trozos
+    # entre los procesos y devuelve, en el mismo orden, listas de igualdades
+    # distintas entre sí y de 'exclude' (pueden faltar si la configuración no
+    # da para más). Con el mismo seed el resultado es el mismo.
+    rng = random.Random(seed)
+    processes = processes or os.cpu_count() or 1
+    jobs = []
+    owners = []
+    for i, (eq_length, operators, count) in enumerate(requests):
+        chunks = max(1, min(processes, count))
+        for c in range(chunks):
+            jobs.append((eq_length, operators, count // chunks + (c < count % chunks), rng.getrandbits(64)))
+            owners.append(i)
+
+    if processes == 1 or len(jobs) == 1:
+        results = list(map(_generate_chunk, jobs))
+    else:
+        with Pool(min(processes, len(jobs))) as pool:
+            results = pool.map(_generate_chunk, jobs)
+
+    seen = set(exclude)
+    generated = [[] for _ in requests]
+    for i, chunk in zip(owners, results):
+        for equality in chunk:
+            if equality not in seen:
+                seen.add(equality)
+                generated[i].append(equality)
+
+    # Los trozos pueden repetirse entre sí: se completa en serie
+    for i, (eq_length, operators, count) in enumerate(requests):
+        missing = count - len(generated[i])
+        if missing > 0:
+            random.seed(rng.getrandbits(64))
+            extra = Game(eq_length=eq_length, operators=operators).generate_equalities(missing, seen)
+            seen.update(extra)
+            generated[i] += extra
+    return generated
+
+
+def generate_candidates(eq_length, operators, count, processes=None, seed=None):
+    return generate_many([(eq_length, operators, count)], processes, seed)[0]
+
+
+def refill(eq_length, operators, low_water=None, target=None, processes=None):
+    # Si quedan menos de low_water igualdades disponibles, genera hasta llegar
+    # a target. Devuelve (disponibles antes, insertadas).
+    operators = operators_key(operators)
+    low_water = pool_low_water() if low_water is None else low_water
+    target = pool_target() if target is None else target
+
+    available = PooledEquation.available(eq_length, operators).count()
+    if available >= low_water:
+        return available, 0
+
+    candidates = generate_candidates(eq_length, operators, target - available, processes)
+    PooledEquation.objects.bulk_create(
+        [PooledEquation(eq_length=eq_length, operators=operators, equality=e) for e in candidates],
+        ignore_conflicts=True)
+    # Con ignore_conflicts Postgres no informa cuáles se omitieron
+    inserted = PooledEquation.available(eq_length, operators).count() - available
+    return available, max(inserted, 0)
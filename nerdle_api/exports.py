@@ -0,0 +1,76 @@
+import csv
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from nerdle_api.models import ArchivedPlay, Play
+
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+# Filas por página (keyset sobre id): la memoria no depende del total, y no
+# hace falta un cursor del lado del servidor (que pgbouncer en modo
+# transaction no permite)
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = ('id', 'game', 'player', 'player__name', 'equality', 'is_valid', 'error_type',
+                 'results', 'eqs_state', 'finished', 'created')
+EXPORT_HEADER = ('id', 'game', 'player_id', 'player', 'equality', 'is_valid', 'error_type',
+                 'results', 'eqs_state', 'finished', 'created')
+
+
+def export_queryset(game_id=None, tournament_id=None, model=Play):
+    plays = model.objects.all()
+    if game_id is not None:
+        plays = plays.filter(game=game_id)
+    if tournament_id is not None:
+        plays = plays.filter(game__tournaments=tournament_id)
+    # El nombre del jugador viene en la misma consulta (JOIN), sin un query por fila
+    return plays.order_by('id').values_list(*EXPORT_FIELDS)
+
+
+def keyset_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # queryset: values_list ordenado por id con el id como primera columna.
+    # Cada página es una consulta corta: WHERE id > último LIMIT chunk_size.
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+class _Line:
+    # csv.writer escribe aquí y la fila se devuelve en vez de acumularse
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        row = list(row)
+        results, eqs_state = row[7], row[8]
+        row[7] = '|'.join(results) if results is not None else ''
+        row[8] = '|'.join('1' if s else '0' for s in eqs_state) if eqs_state is not None else ''
+        row[10] = row[10].isoformat()
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_HEADER, row))) + '\n'
+
+
+def export_lines(export_format, game_id=None, tournament_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Primero lo archivado (jugadas más antiguas), después las vigentes
+    rows = chain(
+        keyset_rows(export_queryset(game_id, tournament_id, ArchivedPlay), chunk_size),
+        keyset_rows(export_queryset(game_id, tournament_id), chunk_size),
+    )
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return jsonl_lines(rows)
@@ -0,0 +1,134 @@
+from functools import lru_cache
+import operator
+
+
+RESOLVE_CACHE_SIZE = 65536
+
+DIGITS = frozenset('0123456789')
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '//': operator.floordiv,
+    '%': operator.mod,
+}
+
+
+class ExpressionError(Exception):
+    pass
+
+
+class UnsupportedExpression(Exception):
+    pass
+
+
+def tokenize(expression):
+    # Mismos reemplazos que el camino original con eval: división entera y elevado
+    source = expression.replace('/', '//').replace('^', '**')
+    tokens = []
+    pos = 0
+    length = len(source)
+    while pos < length:
+        c = source[pos]
+        if c in DIGITS:
+            end = pos + 1
+            while end < length and source[end] in DIGITS:
+                end += 1
+            literal = source[pos:end]
+            # Python no acepta ceros a la izquierda salvo que sean todos ceros
+            if literal[0] == '0' and literal.strip('0'):
+                raise ExpressionError(literal)
+            try:
+                tokens.append(int(literal))
+            except ValueError:
+                # Más dígitos que sys.get_int_max_str_digits(): eval tampoco daba valor
+                raise ExpressionError(literal)
+            pos = end
+        elif source.startswith('**', pos) or source.startswith('//', pos):
+            tokens.append(source[pos:pos + 2])
+            pos += 2
+        elif c in '+-*%':
+            tokens.append(c)
+            pos += 1
+        else:
+            raise UnsupportedExpression(c)
+    return tokens
+
+
+class _Parser:
+    # Descenso recursivo con la misma precedencia y asociatividad que Python:
+    # expr := term (('+'|'-') term)*
+    # term := factor (('*'|'//'|'%') factor)*
+    # factor := ('+'|'-') factor | power
+    # power := atom ['**' factor]
+    # atom := NUMBER
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        value = self.expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(self.peek())
+        return value
+
+    def expr(self):
+        value = self.term()
+        while self.peek() in ('+', '-'):
+            op = BINARY_OPERATORS[self.next()]
+            value = op(value, self.term())
+        return value
+
+    def term(self):
+        value = self.factor()
+        while self.peek() in ('*', '//', '%'):
+            op = BINARY_OPERATORS[self.next()]
+            value = op(value, self.factor())
+        return value
+
+    def factor(self):
+        token = self.peek()
+        if token == '-':
+            self.next()
+            return -self.factor()
+        if token == '+':
+            self.next()
+            return +self.factor()
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek() == '**':
+            self.next()
+            return base ** self.factor()
+        return base
+
+    def atom(self):
+        token = self.next()
+        if isinstance(token, int):
+            return token
+        raise ExpressionError(token)
+
+
+@lru_cache(maxsize=RESOLVE_CACHE_SIZE)
+def resolve(operation):
+    # Fuera de la gramática de Nerdle no hay valor (nunca se usa eval)
+    try:
+        tokens = tokenize(operation)
+    except (UnsupportedExpression, ExpressionError):
+        return None
+
+    try:
+        return _Parser(tokens).parse()
+    except Exception:
+        return None
@@ -0,0 +1,79 @@
+from django import forms
+from django.contrib.postgres.forms import SimpleArrayField
+from django.db import models
+
+from nerdle_api.packing import bools_to_mask, mask_to_bools, pack_results, unpack_results
+
+
+class PackedResultsField(models.BinaryField):
+    """Lista de resultados ('0'/'1'/'2' por símbolo) guardada en 2 bits por símbolo.
+
+    En Python se comporta como el ArrayField(TextField) que reemplaza.
+    """
+    description = 'Resultados empaquetados en 2 bits por símbolo'
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        return unpack_results(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, list):
+            return value
+        if isinstance(value, str):
+            return value.split(',') if value else []
+        return unpack_results(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, (list, tuple)):
+            value = pack_results(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return ','.join(value) if value is not None else None
+
+    def formfield(self, **kwargs):
+        # Mismo formulario que el ArrayField (texto separado por comas)
+        return models.Field.formfield(self, **{'form_class': SimpleArrayField,
+                                               'base_field': forms.CharField(),
+                                               **kwargs})
+
+
+class BitmaskField(models.BigIntegerField):
+    """Lista de booleanos guardada como un bigint (ver packing.bools_to_mask).
+
+    En Python se comporta como el ArrayField(BooleanField) que reemplaza.
+    """
+    description = 'Lista de booleanos como máscara de bits'
+
+    def from_db_value(self, value, expression, connection):
+        return mask_to_bools(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, list):
+            return value
+        if isinstance(value, str):
+            return [v == '1' for v in value.split(',')] if value else []
+        return mask_to_bools(super().to_python(value))
+
+    def get_prep_value(self, value):
+        if isinstance(value, (list, tuple)):
+            value = bools_to_mask(value)
+        return super().get_prep_value(value)
+
+    @property
+    def validators(self):
+        # Los rangos de BigIntegerField no aplican a una lista
+        return list(self._validators)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return ','.join('1' if v else '0' for v in value) if value is not None else None
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{'form_class': SimpleArrayField,
+                                               'base_field': forms.BooleanField(required=False),
+                                               **kwargs})
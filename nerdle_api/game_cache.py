@@ -0,0 +1,120 @@
+import hashlib
+import json
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Min, Q
+
+from nerdle_api.db_threads import in_db_thread
+from nerdle_api.models import Game
+
+
+GAME_CACHE_PREFIX = 'nerdle:game:'
+OPEN_GAMES_CACHE_KEY = 'nerdle:open_games'
+# Tope del TTL de los juegos y de la lista. invalidate_game sólo alcanza al
+# caché del worker que atendió la edición si el caché es por proceso
+# (LocMem): los demás ven el cambio a lo más tras este tiempo.
+GAME_CACHE_MAX_TIMEOUT = 60
+
+
+def game_cache_key(game_id):
+    return f'{GAME_CACHE_PREFIX}{game_id}'
+
+
+def get_active_game(game_id):
+    # Juego con id dado cuyo fin no ha pasado. El objeto se guarda en el caché
+    # hasta su 'end' (con tope GAME_CACHE_MAX_TIMEOUT), así cada jugada no
+    # vuelve a consultar la BD.
+    now = datetime.now(timezone.utc)
+    key = game_cache_key(game_id)
+
+    game = cache.get(key)
+    if game is not None:
+        if game.end >= now:
+            return game
+        cache.delete(key)
+        return None
+
+    game = Game.objects.filter(id=game_id, end__gte=now).first()
+    if game is not None:
+        timeout = min((game.end - now).total_seconds(), GAME_CACHE_MAX_TIMEOUT)
+        if timeout >= 1:
+            cache.set(key, game, timeout=int(timeout))
+    return game
+
+
+def invalidate_game(game_id):
+    cache.delete(game_cache_key(game_id))
+
+
+async def aget_active_game(game_id):
+    now = datetime.now(timezone.utc)
+    key = game_cache_key(game_id)
+
+    game = await cache.aget(key)
+    if game is not None:
+        if game.end >= now:
+            return game
+        await cache.adelete(key)
+        return None
+
+    game = await in_db_thread(Game.objects.filter(id=game_id, end__gte=now).first)()
+    if game is not None:
+        timeout = min((game.end - now).total_seconds(), GAME_CACHE_MAX_TIMEOUT)
+        if timeout >= 1:
+            await cache.aset(key, game, timeout=int(timeout))
+    return game
+
+
+def build_open_games(now):
+    # Lista de juegos abiertos ya serializada, con su ETag y Last-Modified.
+    # 'expires' es el próximo start/end de algún juego: ahí cambia la lista.
+    games = list(Game.objects.filter(start__lte=now, end__gte=now).order_by('id'))
+    bounds = Game.objects.aggregate(next_start=Min('start', filter=Q(start__gt=now)),
+                                    last_end=Max('end', filter=Q(end__lt=now)))
+
+    candidates = [g.end for g in games]
+    if bounds['next_start'] is not None:
+        candidates.append(bounds['next_start'])
+    expires = min(candidates, default=now + timedelta(seconds=GAME_CACHE_MAX_TIMEOUT))
+
+    # Un juego "cambia" al editarse o al abrirse (start); sirve para ?since=
+    games = [(g.to_dict(), max(g.modified, g.start)) for g in games]
+    body = json.dumps({"games": [data for data, _ in games]}, cls=DjangoJSONEncoder).encode()
+    changes = [changed for _, changed in games]
+    if bounds['last_end'] is not None:
+        changes.append(bounds['last_end'])
+    return {
+        'body': body,
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+        'last_modified': max(changes, default=now),
+        'expires': expires,
+        'games': games,
+    }
+
+
+def get_open_games():
+    now = datetime.now(timezone.utc)
+    entry = cache.get(OPEN_GAMES_CACHE_KEY)
+    if entry is not None and entry['expires'] > now:
+        return entry
+
+    entry = build_open_games(now)
+    timeout = min(math.ceil((entry['expires'] - now).total_seconds()), GAME_CACHE_MAX_TIMEOUT)
+    if timeout >= 1:
+        cache.set(OPEN_GAMES_CACHE_KEY, entry, timeout=timeout)
+    return entry
+
+
+async def aget_open_games():
+    entry = await cache.aget(OPEN_GAMES_CACHE_KEY)
+    if entry is not None and entry['expires'] > datetime.now(timezone.utc):
+        return entry
+    # Django 4.1 no tiene aggregate async: la reconstrucción va en un thread
+    return await in_db_thread(get_open_games)()
+
+
+def invalidate_open_games():
+    cache.delete(OPEN_GAMES_CACHE_KEY)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from nerdle_api.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Mueve a ArchivedPlay las jugadas de juegos terminados, por lotes cortos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Días después del fin del juego antes de archivar '
+                                 '(por defecto, settings.PLAY_ARCHIVE_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Detenerse después de esta cantidad de lotes')
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Pausa entre lotes, para no competir con el tráfico')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['retention_days'])
+        total = 0
+        batches = 0
+        start = time.perf_counter()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            archived = archive_batch(cutoff, options['batch_size'])
+            if archived == 0:
+                break
+            total += archived
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Lote {batches}: {archived} jugadas')
+            time.sleep(options['sleep'])
+
+        self.stdout.write(f'{total} jugadas archivadas en {batches} lotes '
+                          f'({time.perf_counter() - start:.1f}s, juegos terminados antes de {cutoff:%Y-%m-%d %H:%M})')
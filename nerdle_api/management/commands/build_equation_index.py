@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nerdle_api.equation_index import build_index, operators_key
+from nerdle_api.models import Game
+
+
+class Command(BaseCommand):
+    help = 'Enumera todas las igualdades válidas por (eq_length, operators) y guarda el índice en disco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, action='append', dest='lengths',
+                            help='eq_length a construir (repetible). Por defecto, las de los juegos existentes')
+        parser.add_argument('--operators', action='append',
+                            help='Conjunto de operadores, ej. "+-*/" (repetible)')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Procesos para enumerar en paralelo (por defecto, uno por CPU)')
+        parser.add_argument('--configured', action='store_true',
+                            help='Las de settings.EQUATION_INDEX_CONFIGS, sin consultar la BD (para armar el slug)')
+        parser.add_argument('--directory', default=None,
+                            help='Directorio de salida (por defecto, settings.EQUATION_INDEX_DIR)')
+
+    def handle(self, *args, **options):
+        lengths = options['lengths']
+        operators = options['operators']
+
+        if options['configured']:
+            configs = set()
+            for config in settings.EQUATION_INDEX_CONFIGS:
+                length, _, ops = config.partition(':')
+                if not length.isdigit() or not ops:
+                    raise CommandError(f'Configuración inválida "{config}" en EQUATION_INDEX_CONFIGS, '
+                                       'se espera eq_length:operators (ej. 8:+-*/)')
+                configs.add((int(length), operators_key(ops)))
+        elif lengths or operators:
+            configs = {(length, operators_key(ops))
+                       for length in (lengths or [5])
+                       for ops in (operators or ['+-'])}
+        else:
+            configs = {(length, operators_key(ops))
+                       for length, ops in Game.objects.values_list('eq_length', 'operators').distinct()}
+
+        for eq_length, ops in sorted(configs):
+            start = time.perf_counter()
+            path, count = build_index(eq_length, ops,
+                                      directory=options['directory'],
+                                      processes=options['processes'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{eq_length} [{ops}]: {count} igualdades en {elapsed:.1f}s -> {path}')
@@ -0,0 +1,124 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from nerdle_api import standings
+from nerdle_api.equation_index import operators_key
+from nerdle_api.equation_pool import generate_many
+from nerdle_api.game_cache import invalidate_open_games
+from nerdle_api.models import Game, PooledEquation, Tournament
+from nerdle_api.packing import MASK_MAX_LENGTH
+
+
+def parse_mix(value):
+    # eq_length:eq_count:operators, ej. 8:3:+-*/
+    try:
+        eq_length, eq_count, operators = value.split(':', 2)
+        eq_length, eq_count = int(eq_length), int(eq_count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Mezcla inválida "{value}", se espera eq_length:eq_count:operators (ej. 8:3:+-*/)')
+    if not 1 <= eq_count <= MASK_MAX_LENGTH:
+        raise argparse.ArgumentTypeError(f'Mezcla inválida "{value}", eq_count tiene que estar entre 1 y {MASK_MAX_LENGTH}')
+    return eq_length, eq_count, operators
+
+
+def parse_date(value):
+    date = parse_datetime(value)
+    if date is None:
+        raise argparse.ArgumentTypeError(f'Fecha inválida: {value}')
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = 'Crea un torneo con muchos juegos: genera las igualdades en paralelo y los inserta en bloque'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--name', help='Nombre del torneo nuevo')
+        target.add_argument('--tournament', type=int, help='Id de un torneo existente al que agregar los juegos')
+        parser.add_argument('--games', type=int, required=True, help='Cantidad de juegos')
+        parser.add_argument('--mix', type=parse_mix, action='append', dest='mixes',
+                            help='eq_length:eq_count:operators (repetible, se asignan en orden). '
+                                 'Por defecto 8:1:+-*/')
+        parser.add_argument('--start', type=parse_date, default=None,
+                            help='Inicio de la ventana (ISO 8601, por defecto ahora)')
+        parser.add_argument('--end', type=parse_date, default=None,
+                            help='Fin de la ventana (por defecto, un día por juego)')
+        parser.add_argument('--all-open', action='store_true',
+                            help='Todos los juegos abiertos en toda la ventana, en vez de uno tras otro')
+        parser.add_argument('--not-resettable', action='store_true')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Procesos para generar en paralelo (por defecto, uno por CPU)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Semilla para que la generación sea reproducible')
+
+    def handle(self, *args, **options):
+        count = options['games']
+        if count <= 0:
+            raise CommandError('--games debe ser positivo')
+        mixes = options['mixes'] or [(8, 1, '+-*/')]
+        start = options['start'] or datetime.now(timezone.utc)
+        end = options['end'] or start + timedelta(days=count)
+        if end <= start:
+            raise CommandError('--end debe ser posterior a --start')
+
+        tournament = None
+        exclude = set()
+        if options['tournament'] is not None:
+            tournament = Tournament.objects.filter(id=options['tournament']).first()
+            if tournament is None:
+                raise CommandError(f'No existe el torneo {options["tournament"]}')
+            exclude = {eq for eqs in tournament.games.values_list('equalities', flat=True) for eq in eqs or ()}
+
+        slot = (end - start) / count
+        games = []
+        for i in range(count):
+            eq_length, eq_count, operators = mixes[i % len(mixes)]
+            game_start = start if options['all_open'] else start + i * slot
+            game_end = end if options['all_open'] else start + (i + 1) * slot
+            games.append(Game(start=game_start, end=game_end, eq_length=eq_length, eq_count=eq_count,
+                              operators=operators, resettable=not options['not_resettable']))
+
+        # Un pedido por configuración; las igualdades no se repiten en el torneo
+        configs = {}
+        for game in games:
+            configs[(game.eq_length, game.operators)] = configs.get((game.eq_length, game.operators), 0) + game.eq_count
+        requests = [(eq_length, operators, needed) for (eq_length, operators), needed in configs.items()]
+
+        gen_start = time.perf_counter()
+        generated = generate_many(requests, processes=options['processes'], seed=options['seed'], exclude=exclude)
+        gen_elapsed = time.perf_counter() - gen_start
+        total = sum(len(eqs) for eqs in generated)
+        self.stdout.write(f'{total} igualdades en {gen_elapsed:.2f}s ({total / max(gen_elapsed, 1e-9):.0f}/s)')
+
+        pending = {config: iter(eqs) for config, eqs in zip(configs, generated)}
+        for game in games:
+            game.equalities = [eq for _, eq in zip(range(game.eq_count), pending[(game.eq_length, game.operators)])]
+            if len(game.equalities) < game.eq_count:
+                raise CommandError(f'No hay suficientes igualdades distintas para {game.eq_length} '
+                                   f'[{game.operators}] en el torneo')
+
+        db_start = time.perf_counter()
+        with transaction.atomic():
+            if tournament is None:
+                tournament = Tournament.objects.create(name=options['name'])
+            Game.objects.bulk_create(games)
+            # Registradas como entregadas, para que el pool y los juegos creados
+            # después desde el admin no las repitan
+            PooledEquation.objects.bulk_create(
+                [PooledEquation(eq_length=game.eq_length, operators=operators_key(game.operators), equality=eq,
+                                drawn=True, game=game)
+                 for game in games for eq in game.equalities], ignore_conflicts=True)
+            Tournament.games.through.objects.bulk_create(
+                [Tournament.games.through(tournament_id=tournament.id, game_id=game.id) for game in games])
+            # bulk_create no dispara post_save ni m2m_changed
+            transaction.on_commit(invalidate_open_games)
+            transaction.on_commit(lambda: standings.invalidate_tournament(tournament.id))
+        db_elapsed = time.perf_counter() - db_start
+
+        self.stdout.write(f'Torneo {tournament.id} ({tournament.name}): {len(games)} juegos '
+                          f'insertados en {db_elapsed:.2f}s')
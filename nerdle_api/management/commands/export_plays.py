@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nerdle_api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Exporta las jugadas de un juego o torneo como CSV o JSONL, en streaming'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--game', type=int)
+        target.add_argument('--tournament', type=int)
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', default='-', help='Archivo de salida (por defecto, stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['format'], options['game'], options['tournament'],
+                             chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            out = sys.stdout
+            close = False
+        else:
+            try:
+                out = open(options['output'], 'w', newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError(f'No se pudo abrir {options["output"]}: {e}')
+            close = True
+
+        rows = 0
+        try:
+            for line in lines:
+                out.write(line)
+                rows += 1
+        finally:
+            if close:
+                out.close()
+
+        if options['format'] == 'csv':
+            rows -= 1  # encabezado
+        self.stderr.write(f'{rows} jugadas exportadas')
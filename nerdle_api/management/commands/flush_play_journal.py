@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from nerdle_api.write_behind import journal_dir, orphan_segments, recover
+
+
+class Command(BaseCommand):
+    help = 'Inserta las jugadas de los segmentos del journal de write-behind que dejaron procesos terminados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None,
+                            help='Directorio del journal (por defecto, settings.PLAY_JOURNAL_DIR)')
+        parser.add_argument('--all', action='store_true',
+                            help='Incluir los segmentos de procesos vivos u otros hosts '
+                                 '(sólo con los workers detenidos)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or journal_dir()
+        if options['dry_run']:
+            for path in orphan_segments(directory, options['all']):
+                self.stdout.write(str(path))
+            return
+
+        segments, inserted = recover(directory, options['all'])
+        self.stdout.write(f'{inserted} jugadas insertadas desde {segments} segmentos de {directory}')
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from nerdle_api.archive import archived_games
+from nerdle_api.models import Play, PlayerGameState
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla PlayerGameState a partir de las jugadas existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', type=int, action='append', dest='games',
+                            help='Limitar a estos juegos (repetible). Por defecto, todos')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        plays = Play.objects.filter(results__isnull=False, is_valid=True)
+        states = PlayerGameState.objects.all()
+        if options['games']:
+            plays = plays.filter(game__in=options['games'])
+            states = states.filter(game__in=options['games'])
+        # Los juegos con jugadas archivadas ya terminaron: su estado es definitivo
+        plays = plays.exclude(game__in=archived_games())
+        states = states.exclude(game__in=archived_games())
+
+        counts = {
+            (row['player'], row['game']): row['plays_count']
+            for row in plays.values('player', 'game').annotate(plays_count=Count('id'))
+        }
+        # DISTINCT ON (player, game): la última jugada válida de cada par
+        last_plays = plays.order_by('player', 'game', '-created').distinct('player', 'game')
+
+        # reset_at se conserva: write_behind lo usa para descartar jugadas viejas
+        resets = {(player_id, game_id): reset_at for player_id, game_id, reset_at
+                  in states.filter(reset_at__isnull=False).values_list('player', 'game', 'reset_at')}
+        new_states = [
+            PlayerGameState(player_id=p.player_id,
+                            game_id=p.game_id,
+                            plays_count=counts[(p.player_id, p.game_id)],
+                            eqs_state=p.eqs_state,
+                            finished=p.finished,
+                            last_play_id=p.id,
+                            reset_at=resets.pop((p.player_id, p.game_id), None))
+            for p in last_plays.only('id', 'player', 'game', 'eqs_state', 'finished').iterator()
+        ]
+        new_states += [PlayerGameState(player_id=player_id, game_id=game_id, reset_at=reset_at)
+                       for (player_id, game_id), reset_at in resets.items()]
+
+        with transaction.atomic():
+            deleted, _ = states.delete()
+            PlayerGameState.objects.bulk_create(new_states, batch_size=options['batch_size'])
+
+        self.stdout.write(f'Eliminados {deleted} estados, creados {len(new_states)}')
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from nerdle_api.equation_index import operators_key
+from nerdle_api.equation_pool import pool_configs, pool_low_water, pool_target, refill
+
+
+class Command(BaseCommand):
+    help = 'Mantiene el pool de igualdades pregeneradas de cada configuración sobre el mínimo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, action='append', dest='lengths',
+                            help='eq_length a mantener (repetible). Por defecto, las de los juegos existentes')
+        parser.add_argument('--operators', action='append',
+                            help='Conjunto de operadores, ej. "+-*/" (repetible)')
+        parser.add_argument('--low-water', type=int, default=None,
+                            help='Mínimo de igualdades disponibles (por defecto, settings.EQUATION_POOL_LOW_WATER)')
+        parser.add_argument('--target', type=int, default=None,
+                            help='Cantidad a la que se rellena (por defecto, settings.EQUATION_POOL_TARGET)')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Procesos para generar en paralelo (por defecto, uno por CPU)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Seguir corriendo y revisar los pools cada --interval segundos')
+        parser.add_argument('--interval', type=float, default=30)
+
+    def handle(self, *args, **options):
+        low_water = options['low_water'] if options['low_water'] is not None else pool_low_water()
+        target = max(options['target'] if options['target'] is not None else pool_target(), low_water)
+
+        while True:
+            self.refill_all(options, low_water, target)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def configs(self, options):
+        lengths = options['lengths']
+        operators = options['operators']
+        if lengths or operators:
+            return sorted({(length, operators_key(ops))
+                           for length in (lengths or [5])
+                           for ops in (operators or ['+-'])})
+        return pool_configs()
+
+    def refill_all(self, options, low_water, target):
+        for eq_length, ops in self.configs(options):
+            start = time.perf_counter()
+            available, inserted = refill(eq_length, ops, low_water=low_water, target=target,
+                                         processes=options['processes'])
+            if available >= low_water:
+                continue
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{eq_length} [{ops}]: {available} disponibles, {inserted} nuevas en {elapsed:.1f}s')
+            if inserted == 0:
+                self.stderr.write(f'{eq_length} [{ops}]: no se generaron igualdades nuevas, '
+                                  f'la configuración puede estar agotada')
@@ -0,0 +1,53 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nerdle_api.models import Game
+from nerdle_api.solver import replay_game
+
+
+class Command(BaseCommand):
+    help = 'Reproduce las jugadas de un juego con el solver de referencia y mide cuántas candidatas elimina cada una'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', type=int, required=True)
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Procesos para repartir los jugadores (por defecto, uno por CPU)')
+        parser.add_argument('--best', action='store_true',
+                            help='Calcular además la mejor jugada (entropía máxima) en cada paso; es más lento')
+        parser.add_argument('--csv', action='store_true',
+                            help='Una fila por jugada e igualdad en vez del resumen por jugador')
+
+    def handle(self, *args, **options):
+        game = Game.objects.filter(id=options['game']).first()
+        if game is None:
+            raise CommandError(f'No existe el juego {options["game"]}')
+
+        start = time.perf_counter()
+        replays = replay_game(game, best=options['best'], processes=options['processes'])
+        elapsed = time.perf_counter() - start
+
+        if options['csv']:
+            writer = csv.writer(self.stdout)
+            writer.writerow(['player', 'player_id', 'play', 'guess', 'target', 'before', 'after', 'eliminated',
+                             'expected_bits', 'best_guess', 'best_bits'])
+            for (name, player_id), rows in replays.items():
+                for n, row in enumerate(rows, 1):
+                    for t, target in enumerate(row['targets']):
+                        writer.writerow([name, player_id, n, row['guess'], t, target['before'], target['after'],
+                                         target['eliminated'], f'{target["expected_bits"]:.3f}',
+                                         target['best_guess'] or '',
+                                         f'{target["best_bits"]:.3f}' if target['best_bits'] is not None else ''])
+            return
+
+        for (name, player_id), rows in replays.items():
+            targets = [t for row in rows for t in row['targets'] if t['before'] > 1]
+            fraction = sum(t['eliminated'] / t['before'] for t in targets) / len(targets) if targets else 0.0
+            bits = sum(t['expected_bits'] for t in targets)
+            line = f'{name} ({player_id}): {len(rows)} jugadas, {fraction:.1%} eliminadas por jugada, {bits:.1f} bits esperados'
+            if options['best'] and targets:
+                best_bits = sum(t['best_bits'] for t in targets)
+                line += f' (mejor posible {best_bits:.1f}, eficiencia {bits / best_bits:.0%})' if best_bits else ''
+            self.stdout.write(line)
+        self.stdout.write(f'{len(replays)} jugadores en {elapsed:.1f}s')
@@ -0,0 +1,143 @@
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+
+# Buckets en segundos (latencias) y en cantidad (consultas por request)
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Histogramas por (métrica, etiquetas), agregados en el proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._help = {}
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, **labels):
+        self.observe_many([(name, value, buckets, tuple(sorted(labels.items())))])
+
+    def observe_many(self, observations):
+        # observations: (name, value, buckets, labels ordenados); un solo lock
+        with self._lock:
+            for name, value, buckets, labels in observations:
+                histogram = self._histograms.get((name, labels))
+                if histogram is None:
+                    histogram = self._histograms[(name, labels)] = Histogram(buckets)
+                histogram.observe(value)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        # Formato de texto de Prometheus (version 0.0.4). Cada worker tiene su
+        # propio registro: la etiqueta worker (pid) separa sus series, así un
+        # scrape que cae en otro worker no hace saltar los contadores; se
+        # agregan con sum without (worker) en la consulta.
+        worker = (('worker', os.getpid()),)
+        with self._lock:
+            items = sorted((key, labels + worker, h) for (key, labels), h in self._histograms.items())
+            lines = []
+            last_name = None
+            for name, labels, h in items:
+                if name != last_name:
+                    if name in self._help:
+                        lines.append(f'# HELP {name} {self._help[name]}')
+                    lines.append(f'# TYPE {name} histogram')
+                    last_name = name
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {h.count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(h.sum)}')
+                lines.append(f'{name}_count{_labels(labels)} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+registry = Registry()
+registry.describe('nerdle_request_duration_seconds', 'Latencia del request por ruta')
+registry.describe('nerdle_request_queries', 'Consultas SQL por request')
+registry.describe('nerdle_request_query_duration_seconds', 'Tiempo total en SQL por request')
+registry.describe('nerdle_game_method_duration_seconds', 'Tiempo en los métodos críticos de Game')
+
+
+class RequestMetrics:
+
+    def __init__(self, record_queries=False):
+        self.record_queries = record_queries
+        self.query_count = 0
+        self.query_time = 0.0
+        self.queries = []
+        self.method_time = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_count += 1
+            self.query_time += elapsed
+            if self.record_queries:
+                self.queries.append((sql, elapsed))
+
+
+current_request = ContextVar('nerdle_request_metrics', default=None)
+
+
+def timed(name):
+    # Mide un método de Game sólo cuando hay un request instrumentado en curso
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = current_request.get()
+            if metrics is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.method_time[name] = metrics.method_time.get(name, 0.0) + elapsed
+                registry.observe('nerdle_game_method_duration_seconds', elapsed, method=name)
+        return wrapper
+    return decorator
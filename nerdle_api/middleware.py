@@ -0,0 +1,101 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware as BaseAuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware as BaseMessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware as BaseSessionMiddleware
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.middleware.clickjacking import XFrameOptionsMiddleware as BaseXFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware as BaseCsrfViewMiddleware
+
+from nerdle_api.metrics import COUNT_BUCKETS, DURATION_BUCKETS, RequestMetrics, current_request, registry
+
+
+logger = logging.getLogger('nerdle_api.metrics')
+
+
+class MetricsMiddleware:
+    # Latencia, consultas SQL y tiempo en Game por ruta. Se activa con
+    # METRICS_ENABLED; con METRICS_SLOW_REQUEST_MS > 0 registra los requests
+    # lentos junto con sus consultas.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 0)
+
+    def __call__(self, request):
+        metrics = RequestMetrics(record_queries=self.slow_ms > 0)
+        db = connections[DEFAULT_DB_ALIAS]
+        token = current_request.set(metrics)
+        start = time.perf_counter()
+        try:
+            with db.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        route_label = (('route', route),)
+        registry.observe_many([
+            ('nerdle_request_duration_seconds', elapsed, DURATION_BUCKETS,
+             (('method', request.method), ('route', route), ('status', response.status_code))),
+            ('nerdle_request_queries', metrics.query_count, COUNT_BUCKETS, route_label),
+            ('nerdle_request_query_duration_seconds', metrics.query_time, DURATION_BUCKETS, route_label),
+        ])
+
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            logger.warning('Slow request %s %s (%s): %.1f ms, %d queries (%.1f ms), game methods %s\n%s',
+                           request.method, request.path, route, elapsed * 1000,
+                           metrics.query_count, metrics.query_time * 1000,
+                           {k: round(v * 1000, 2) for k, v in metrics.method_time.items()},
+                           '\n'.join(f'  [{t * 1000:.2f} ms] {sql}' for sql, t in metrics.queries))
+
+        return response
+
+
+class SkipLightPathsMixin:
+    # Middlewares del admin que pasan de largo en LIGHT_MIDDLEWARE_PATHS (rutas
+    # de la API, que no usan sesión, usuario, mensajes ni CSRF): el request va
+    # directo al siguiente y la respuesta vuelve sin tocarla. En modo async
+    # get_response devuelve la corrutina, que el handler espera.
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.light_paths = tuple(getattr(settings, 'LIGHT_MIDDLEWARE_PATHS', ()))
+        self.light_exclude = tuple(getattr(settings, 'LIGHT_MIDDLEWARE_EXCLUDE', ()))
+
+    def is_light(self, request):
+        path = request.path_info
+        return path.startswith(self.light_paths) and not path.startswith(self.light_exclude)
+
+    def __call__(self, request):
+        if self.is_light(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipLightPathsMixin, BaseSessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkipLightPathsMixin, BaseCsrfViewMiddleware):
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.is_light(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(SkipLightPathsMixin, BaseAuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipLightPathsMixin, BaseMessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(SkipLightPathsMixin, BaseXFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,64 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:59
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_player_game_states(apps, schema_editor):
+    # Igual que manage.py rebuild_player_game_states: sin esto los jugadores
+    # con un juego en curso quedarían con 0 jugadas y sin terminar
+    Play = apps.get_model('nerdle_api', 'Play')
+    PlayerGameState = apps.get_model('nerdle_api', 'PlayerGameState')
+
+    plays = Play.objects.filter(results__isnull=False, is_valid=True)
+    counts = {
+        (row['player'], row['game']): row['plays_count']
+        for row in plays.values('player', 'game').annotate(plays_count=models.Count('id'))
+    }
+    # DISTINCT ON (player, game): la última jugada válida de cada par
+    last_plays = plays.order_by('player', 'game', '-created', '-id').distinct('player', 'game') \
+        .only('id', 'player', 'game', 'eqs_state', 'finished')
+
+    batch = []
+    for p in last_plays.iterator(chunk_size=2000):
+        batch.append(PlayerGameState(player_id=p.player_id, game_id=p.game_id,
+                                     plays_count=counts[(p.player_id, p.game_id)],
+                                     eqs_state=p.eqs_state, finished=p.finished,
+                                     last_play_id=p.id))
+        if len(batch) >= 2000:
+            PlayerGameState.objects.bulk_create(batch)
+            batch = []
+    PlayerGameState.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0002_play_error_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='play',
+            name='error_type',
+            field=models.CharField(choices=[('L', 'INVALID LENGTH'), ('E', 'NOT EQUAL'), ('M', 'MANY EQUALS'), ('S', 'INVALID SYMBOL'), ('R', 'NO NUMBER ON RIGHT'), ('I', 'INEQUALITY'), ('P', 'MULTIPLE POW'), ('X', 'POW RESTRICTION')], default=None, max_length=1, null=True),
+        ),
+        migrations.CreateModel(
+            name='PlayerGameState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plays_count', models.IntegerField(default=0)),
+                ('eqs_state', django.contrib.postgres.fields.ArrayField(base_field=models.BooleanField(default=False), blank=True, null=True, size=None)),
+                ('finished', models.BooleanField(default=False)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nerdle_api.game')),
+                ('last_play', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='nerdle_api.play')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nerdle_api.player')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='playergamestate',
+            constraint=models.UniqueConstraint(fields=('player', 'game'), name='unique_player_game_state'),
+        ),
+        migrations.RunPython(backfill_player_game_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0003_player_game_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='player',
+            name='key',
+            field=models.CharField(max_length=10, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['start', 'end'], name='game_start_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='play',
+            index=models.Index(condition=models.Q(('is_valid', True), ('results__isnull', False)), fields=['player', 'game', '-created'], name='play_valid_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, blank=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
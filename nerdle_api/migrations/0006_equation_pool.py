@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0005_game_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PooledEquation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eq_length', models.IntegerField()),
+                ('operators', models.CharField(max_length=10)),
+                ('equality', models.CharField(max_length=20)),
+                ('drawn', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='nerdle_api.game')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pooledequation',
+            index=models.Index(condition=models.Q(('drawn', False)), fields=['eq_length', 'operators', 'id'], name='pooled_equation_available_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pooledequation',
+            constraint=models.UniqueConstraint(fields=('eq_length', 'operators', 'equality'), name='unique_pooled_equation'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0006_equation_pool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPlay',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('equality', models.CharField(blank=True, max_length=20, null=True)),
+                ('is_valid', models.BooleanField(default=True)),
+                ('error_type', models.CharField(choices=[('L', 'INVALID LENGTH'), ('E', 'NOT EQUAL'), ('M', 'MANY EQUALS'), ('S', 'INVALID SYMBOL'), ('R', 'NO NUMBER ON RIGHT'), ('I', 'INEQUALITY'), ('P', 'MULTIPLE POW'), ('X', 'POW RESTRICTION')], default=None, max_length=1, null=True)),
+                ('results', models.BinaryField(blank=True, null=True)),
+                ('eqs_state', models.BinaryField(blank=True, null=True)),
+                ('finished', models.BooleanField(default=False)),
+                ('created', models.DateTimeField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nerdle_api.game')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nerdle_api.player')),
+            ],
+        ),
+    ]
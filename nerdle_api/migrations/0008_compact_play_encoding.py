@@ -0,0 +1,170 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+import nerdle_api.fields
+from nerdle_api.packing import MASK_MAX_LENGTH, bools_to_mask, mask_to_bools, pack_bools, pack_results, \
+    unpack_bools, unpack_results
+
+
+BATCH_SIZE = 2000
+
+
+def convert(model, fields, batch_size=BATCH_SIZE):
+    # fields: [(campo de origen, campo de destino, función)]. Por lotes de id
+    # para no cargar la tabla completa en memoria.
+    sources = [source for source, _, _ in fields]
+    last_id = None
+    while True:
+        rows = model.objects.order_by('id')
+        if last_id is not None:
+            rows = rows.filter(id__gt=last_id)
+        rows = list(rows.only('id', *sources)[:batch_size])
+        if not rows:
+            break
+        for row in rows:
+            for source, target, encode in fields:
+                setattr(row, target, encode(getattr(row, source)))
+        model.objects.bulk_update(rows, [target for _, target, _ in fields])
+        last_id = rows[-1].id
+
+
+def check_mask_lengths(apps, schema_editor):
+    # eqs_state pasa a un bigint: con más de MASK_MAX_LENGTH ecuaciones no
+    # entra. Mejor cortar antes de tocar el esquema que a mitad de la conversión.
+    Game = apps.get_model('nerdle_api', 'Game')
+    games = list(Game.objects.filter(eq_count__gt=MASK_MAX_LENGTH).values_list('id', flat=True)[:20])
+    games += Game.objects.filter(equalities__len__gt=MASK_MAX_LENGTH).exclude(id__in=games) \
+        .values_list('id', flat=True)[:20]
+    if games:
+        raise RuntimeError(f'Hay juegos con más de {MASK_MAX_LENGTH} ecuaciones (ids: {games}); '
+                           'eqs_state no entra en la máscara. Hay que borrarlos o partirlos antes de migrar.')
+
+    Play = apps.get_model('nerdle_api', 'Play')
+    PlayerGameState = apps.get_model('nerdle_api', 'PlayerGameState')
+    for model in (Play, PlayerGameState):
+        if model.objects.filter(eqs_state__len__gt=MASK_MAX_LENGTH).exists():
+            raise RuntimeError(f'Hay filas de {model.__name__} con eqs_state de más de {MASK_MAX_LENGTH} '
+                               'posiciones; no entran en la máscara.')
+
+
+def compact_forward(apps, schema_editor):
+    convert(apps.get_model('nerdle_api', 'Play'),
+            [('results', 'results_packed', pack_results), ('eqs_state', 'eqs_state_mask', bools_to_mask)])
+    convert(apps.get_model('nerdle_api', 'PlayerGameState'),
+            [('eqs_state', 'eqs_state_mask', bools_to_mask)])
+    convert(apps.get_model('nerdle_api', 'ArchivedPlay'),
+            [('eqs_state', 'eqs_state_mask', lambda data: bools_to_mask(unpack_bools(data)))])
+
+
+def compact_backward(apps, schema_editor):
+    convert(apps.get_model('nerdle_api', 'Play'),
+            [('results_packed', 'results', unpack_results), ('eqs_state_mask', 'eqs_state', mask_to_bools)])
+    convert(apps.get_model('nerdle_api', 'PlayerGameState'),
+            [('eqs_state_mask', 'eqs_state', mask_to_bools)])
+    convert(apps.get_model('nerdle_api', 'ArchivedPlay'),
+            [('eqs_state_mask', 'eqs_state', lambda mask: pack_bools(mask_to_bools(mask)))])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0007_archived_play'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_mask_lengths, migrations.RunPython.noop),
+        # El índice parcial depende de results: se rehace sobre la columna nueva
+        migrations.RemoveIndex(
+            model_name='play',
+            name='play_valid_latest_idx',
+        ),
+        migrations.AddField(
+            model_name='play',
+            name='results_packed',
+            field=models.BinaryField(blank=True, null=True, editable=True),
+        ),
+        migrations.AddField(
+            model_name='play',
+            name='eqs_state_mask',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='playergamestate',
+            name='eqs_state_mask',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedplay',
+            name='eqs_state_mask',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(compact_forward, compact_backward),
+        migrations.RemoveField(
+            model_name='play',
+            name='results',
+        ),
+        migrations.RemoveField(
+            model_name='play',
+            name='eqs_state',
+        ),
+        migrations.RemoveField(
+            model_name='playergamestate',
+            name='eqs_state',
+        ),
+        migrations.RemoveField(
+            model_name='archivedplay',
+            name='eqs_state',
+        ),
+        migrations.RenameField(
+            model_name='play',
+            old_name='results_packed',
+            new_name='results',
+        ),
+        migrations.RenameField(
+            model_name='play',
+            old_name='eqs_state_mask',
+            new_name='eqs_state',
+        ),
+        migrations.RenameField(
+            model_name='playergamestate',
+            old_name='eqs_state_mask',
+            new_name='eqs_state',
+        ),
+        migrations.RenameField(
+            model_name='archivedplay',
+            old_name='eqs_state_mask',
+            new_name='eqs_state',
+        ),
+        # Mismos tipos en la BD (bytea, bigint): sólo cambia la conversión en Python
+        migrations.AlterField(
+            model_name='play',
+            name='results',
+            field=nerdle_api.fields.PackedResultsField(blank=True, editable=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='play',
+            name='eqs_state',
+            field=nerdle_api.fields.BitmaskField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='playergamestate',
+            name='eqs_state',
+            field=nerdle_api.fields.BitmaskField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedplay',
+            name='results',
+            field=nerdle_api.fields.PackedResultsField(blank=True, editable=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedplay',
+            name='eqs_state',
+            field=nerdle_api.fields.BitmaskField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='play',
+            index=models.Index(condition=models.Q(('is_valid', True), ('results__isnull', False)),
+                               fields=['player', 'game', '-created'], name='play_valid_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0008_compact_play_encoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='play_rate_limit',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='play_rate_limit',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:22
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0009_play_rate_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayJournalSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='play',
+            name='created',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:02
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0010_play_write_behind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='eq_count',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(62)]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nerdle_api', '0011_game_eq_count_max'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playergamestate',
+            name='reset_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
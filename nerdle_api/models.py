@@ -1,7 +1,17 @@
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, models, transaction
+from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
 import random
 
+from nerdle_api.equation_index import get_index, operators_key
+from nerdle_api.expressions import resolve
+from nerdle_api.metrics import timed
+from nerdle_api.fields import BitmaskField, PackedResultsField
+from nerdle_api.packing import MASK_MAX_LENGTH, bools_to_mask, mask_to_bools
+from nerdle_api.scoring import NUMPY_MIN_BATCH, np, score, score_many, score_many_numpy
+from nerdle_api.validation import DIGIT_SYMBOLS, check_equality
+
 
 ERROR_TYPES = (
     ("L", "INVALID LENGTH"),
@@ -14,18 +24,30 @@ ERROR_TYPES = (
     ("X", "POW RESTRICTION"),
 )
 
+# Rondas de generar y reservar en el pool cuando el pool no alcanza
+CLAIM_ATTEMPTS = 3
+
 
 class Game(models.Model):
     start = models.DateTimeField()
     end = models.DateTimeField()
 
     eq_length = models.IntegerField(default=5)
-    eq_count = models.IntegerField(default=1)
+    # eqs_state se guarda como máscara en un bigint: no más de MASK_MAX_LENGTH
+    eq_count = models.IntegerField(default=1, validators=[MinValueValidator(1), MaxValueValidator(MASK_MAX_LENGTH)])
     operators = models.TextField(default='+-')
     equalities = ArrayField(models.TextField(blank=True, null=True), blank=True, null=True)
     resettable = models.BooleanField(default=True)
+    # Jugadas por minuto por jugador (vacío: la del torneo o PLAY_RATE_LIMIT; 0 sin límite)
+    play_rate_limit = models.PositiveIntegerField(blank=True, null=True)
 
     created = models.DateTimeField(auto_now_add=True, blank=True)
+    modified = models.DateTimeField(auto_now=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start', 'end'], name='game_start_end_idx'),
+        ]
 
     def __str__(self):
         return f'{self.id}: {self.operators} {self.eq_length} {len(self.equalities)} [{self.start}]'
@@ -44,7 +66,7 @@ class Game(models.Model):
 
     @property
     def valid_symbols(self):
-        symbols = [str(d) for d in range(0, 10)]
+        symbols = list(DIGIT_SYMBOLS)
         symbols.extend(self.operators_list)
         symbols.append('=')
         return symbols
@@ -60,58 +82,126 @@ class Game(models.Model):
         }
 
     def check_play(self, play_equality):
-        return self.equality_error(play_equality) is None
+        return self.validate(play_equality).is_valid
+
+    @timed('validate')
+    def validate(self, equality, all_errors=False):
+        return check_equality(equality, self.eq_length, self.operators, all_errors=all_errors,
+                              index=get_index(self.eq_length, self.operators))
 
     def equality_error(self, equality):
-        if len(equality) != self.eq_length:  # length
-            return 'L'
-        elif equality.count('=') < 1:  # una igualdad
-            return 'E'
-        elif equality.count('=') > 1:  # una igualdad
-            return 'M'
-        elif equality.count('^') > 1:  # multiples elevados
-            return 'P'
-        elif any([c not in self.valid_symbols for c in equality]):  # simbolos validos
-            return 'S'
-        elif not equality[equality.find('=')+1:].lstrip('-').isnumeric():  # numero a la derecha
-            return 'R'
-        elif equality.count('^') == 1 and not self.__validate_pow(equality[equality.find('^')+1:equality.find('=')]):
-            return 'X'
-        elif not self.__validate_equality(equality):  # igualdad valida
-            return 'I'
+        return self.validate(equality).error
 
-        return None
+    @timed('evaluate')
+    def evaluate(self, play, check=None):
+        if check is not None and check.balanced is not None:
+            balanced = check.balanced
+        else:
+            balanced = self.__validate_equality(play)
 
-    def evaluate(self, play):
         results = []
         for eq in self.equalities:
-            r = self.__analyze_equality(play, eq)
+            r = self.__analyze_equality(play, eq, balanced)
             results.append("".join(r))
 
         return results
 
-    def create_equalities(self):
-        eqs = []
-        for i in range(self.eq_count):
-            operation = self.__operation_recursive()
-            res = self.__resolve_operation(operation)
-            eqs.append(f'{operation}={res}')
+    def build_play(self, player, equality, previous_eqs_state=None, all_errors=False):
+        # Calcula la jugada completa en memoria (sin guardarla): validez,
+        # error_type, results, eqs_state acumulado y finished.
+        play = Play(game=self, player=player, equality=equality)
+
+        check = self.validate(equality, all_errors=all_errors)
+        if not check.is_valid:
+            play.is_valid = False
+            play.error_type = check.error
+            return play, check
+
+        play.results = self.evaluate(equality, check)
+        eqs_state = [r == '2'*self.eq_length for r in play.results]
+
+        if previous_eqs_state is not None:
+            eqs_state = [s1 or previous_eqs_state[i] for i, s1 in enumerate(eqs_state)]
+
+        play.eqs_state = eqs_state
+        play.finished = all(play.eqs_state)
+        return play, check
+
+    def evaluate_many(self, plays, backend=None):
+        # Evalúa un lote de jugadas contra todas las igualdades del juego.
+        # Las jugadas que no pasan validate() (largo, símbolos, '^', igualdad)
+        # quedan como None.
+        balanced = [self.validate(p).is_valid for p in plays]
+        valid_plays = [p for p, b in zip(plays, balanced) if b]
+
+        if backend is None:
+            backend = 'numpy' if np is not None and len(valid_plays) >= NUMPY_MIN_BATCH else 'python'
+        if backend == 'numpy':
+            scored = iter(score_many_numpy(valid_plays, self.equalities))
+        else:
+            scored = iter(score_many(valid_plays, self.equalities))
+
+        return [next(scored) if b else None for b in balanced]
+
+    @timed('create_equalities')
+    def create_equalities(self, exclude=()):
+        # Primero del pool pregenerado (manage.py refill_equation_pool); si no
+        # alcanza, del índice o del generador recursivo. Nunca repite una
+        # igualdad de otro juego de sus torneos ni las de 'exclude'.
+        # Las generadas fuera del pool quedan registradas en él como entregadas:
+        # un juego creado antes de estar en un torneo no ve tournament_equalities.
+        exclude = set(exclude) | self.tournament_equalities()
+        game = self if self.pk else None
+        with transaction.atomic():
+            eqs = PooledEquation.draw(self.eq_length, self.operators, self.eq_count, game=game, exclude=exclude)
+            for _ in range(CLAIM_ATTEMPTS):
+                if len(eqs) >= self.eq_count:
+                    break
+                generated = self.generate_equalities(self.eq_count - len(eqs), exclude | set(eqs))
+                if not generated:
+                    break
+                eqs += PooledEquation.claim(self.eq_length, self.operators, generated, game=game)
+                exclude |= set(generated)
 
         self.equalities = eqs
         self.save()
 
+    def tournament_equalities(self):
+        if self.pk is None:
+            return set()
+        others = Game.objects.filter(tournaments__games=self).exclude(pk=self.pk).distinct()
+        return {eq for eqs in others.values_list('equalities', flat=True) for eq in eqs or ()}
+
+    def generate_equalities(self, count, exclude=(), max_attempts=None):
+        # Igualdades válidas y distintas, sin pasar por el pool
+        if count <= 0:
+            return []
+        eqs = []
+        seen = set(exclude)
+        index = get_index(self.eq_length, self.operators)
+        for _ in range(max_attempts or count * 20):
+            if len(eqs) == count:
+                break
+            if index is not None and len(index) > 0:
+                equality = index[random.randrange(len(index))]
+            else:
+                equality = self.generate_equality()
+            if equality is not None and equality not in seen:
+                seen.add(equality)
+                eqs.append(equality)
+        return eqs
+
+    def generate_equality(self):
+        operation = self.__operation_recursive()
+        if operation is None:
+            return None
+        equality = f'{operation}={self.__resolve_operation(operation)}'
+        if not check_equality(equality, self.eq_length, self.operators).is_valid:
+            return None
+        return equality
+
     def __resolve_operation(self, operation):
-        res = None
-        try:
-            # Siempre división entera
-            operation = operation.replace('/', '//')
-            # Reemplazar elevado
-            operation = operation.replace('^', '**')
-            res = eval(operation)
-        except Exception as e:
-            print(e)
-        finally:
-            return res
+        return resolve(operation)
 
     def __validate_equality(self, equality):
         equals_pos = equality.find('=')
@@ -128,25 +218,9 @@ class Game(models.Model):
             return True
         return False
 
-    def __analyze_equality(self, play, equality):
-        if self.__validate_equality(play):
-            r = list('_' * len(equality))
-            play_aux = list(play)
-            equality_aux = list(equality)
-            for pos, c in enumerate(play):
-                if c == equality[pos]:
-                    r[pos] = '2'
-                    equality_aux[pos] = '_'
-                    play_aux[pos] = '_'
-            for pos, c in enumerate(play_aux):
-                if c != '_':
-                    if c in equality_aux and \
-                            sum([1 if x == c else 0 for x in play_aux[:pos + 1]]) <= sum(
-                            [1 if x == c else 0 for x in equality_aux]):
-                        r[pos] = '1'
-                    else:
-                        r[pos] = '0'
-            return r
+    def __analyze_equality(self, play, equality, balanced):
+        if balanced:
+            return list(score(play, equality))
         else:
             return None
 
@@ -201,28 +275,20 @@ class Game(models.Model):
                         res_op = self.__recursive_loop_operator(operation)
                     return res_op
 
-    def __validate_pow(self, sub_operation):
-        op_idxs = [i for i, c in enumerate(sub_operation) if c in self.operators_list]
-        len_digits = op_idxs[0] if len(op_idxs) > 0 else len(sub_operation)
-        if len_digits > 2:
-            return False
-        return True
-
 
 class Player(models.Model):
     name = models.CharField(max_length=200)
-    key = models.CharField(max_length=10)
+    key = models.CharField(max_length=10, unique=True)
     play_count = models.IntegerField(default=0)
 
     def __str__(self):
         return f'{self.name}'
 
     def last_valid_play(self, game):
-        plays = Play.objects.filter(player=self.id,
-                                    game=game,
-                                    results__isnull=False,
-                                    is_valid=True).order_by('-created').all()
-        return plays[0] if len(plays) > 0 else None
+        return Play.objects.filter(player=self.id,
+                                   game=game,
+                                   results__isnull=False,
+                                   is_valid=True).order_by('-created').first()
 
     def game_plays_count(self, game):
         plays = Play.objects.filter(player=self.id,
@@ -231,9 +297,9 @@ class Player(models.Model):
                                     is_valid=True).order_by('-created').count()
         return plays
 
-    def add_play(self):
-        self.play_count += 1
-        self.save()
+    def add_play(self, count=1):
+        # Incremento atómico en la BD, sin read-modify-write
+        Player.objects.filter(pk=self.pk).update(play_count=models.F('play_count') + count)
 
 
 class Play(models.Model):
@@ -243,15 +309,256 @@ class Play(models.Model):
     is_valid = models.BooleanField(default=True)
     error_type = models.CharField(max_length=1, choices=ERROR_TYPES, null=True, default=None)
 
-    results = ArrayField(models.TextField(blank=True, null=True), blank=True, null=True)
-    eqs_state = ArrayField(models.BooleanField(default=False), blank=True, null=True)
+    # Listas en Python; en la BD, bytea de 2 bits por símbolo y un bigint
+    results = PackedResultsField(blank=True, null=True)
+    eqs_state = BitmaskField(blank=True, null=True)
 
     finished = models.BooleanField(default=False)
-    created = models.DateTimeField(auto_now_add=True, blank=True)
+    # default y no auto_now_add: las jugadas diferidas (write_behind) se
+    # insertan después con la hora en que se hicieron
+    created = models.DateTimeField(default=timezone.now, blank=True)
+
+    class Meta:
+        indexes = [
+            # Player.last_valid_play / game_plays_count
+            models.Index(fields=['player', 'game', '-created'],
+                         condition=models.Q(is_valid=True, results__isnull=False),
+                         name='play_valid_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.player} - {self.game} - {self.created}'
+
+    def save_with_state(self):
+        # Guarda una jugada nueva de build_play(player, equality) en una sola
+        # sentencia, sin transacción explícita: incrementa Player.play_count
+        # y, si el jugador no terminó el juego, inserta la jugada y, si es
+        # válida, hace upsert de PlayerGameState acumulando eqs_state con OR.
+        # Devuelve False si el juego ya estaba terminado (no se inserta nada
+        # salvo el contador). eqs_state/finished quedan con lo acumulado.
+        values = {
+            'player': self.player_id,
+            'game': self.game_id,
+            'equality': self.equality,
+            'is_valid': self.is_valid,
+            'error_type': self.error_type,
+            'results': self._meta.get_field('results').get_db_prep_value(self.results, connection),
+            'created': self.created,
+        }
+        tables = {
+            'play': connection.ops.quote_name(Play._meta.db_table),
+            'player': connection.ops.quote_name(Player._meta.db_table),
+            'state': connection.ops.quote_name(PlayerGameState._meta.db_table),
+        }
+        if self.is_valid:
+            values['mask'] = bools_to_mask(self.eqs_state)
+            values['full'] = bools_to_mask([True] * len(self.eqs_state))
+            values['play_table'] = Play._meta.db_table
+            sql = SAVE_VALID_PLAY_SQL.format(**tables)
+        else:
+            sql = SAVE_INVALID_PLAY_SQL.format(**tables)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        self.id, eqs_state, self.finished = row
+        self.eqs_state = mask_to_bools(eqs_state)
+        return True
+
+
+# Play.save_with_state. El id de la jugada se toma antes para guardarlo en
+# last_play dentro de la misma sentencia (las FK de Django son diferidas).
+SAVE_VALID_PLAY_SQL = """
+WITH new_play AS (
+    SELECT nextval(pg_get_serial_sequence(%(play_table)s, 'id')) AS id
+), state AS (
+    INSERT INTO {state} AS s (player_id, game_id, plays_count, eqs_state, finished, last_play_id)
+    SELECT %(player)s, %(game)s, 1, %(mask)s, %(mask)s = %(full)s, new_play.id FROM new_play
+    ON CONFLICT (player_id, game_id) DO UPDATE SET
+        plays_count = s.plays_count + 1,
+        eqs_state = COALESCE(s.eqs_state, 0) | EXCLUDED.eqs_state,
+        finished = (COALESCE(s.eqs_state, 0) | EXCLUDED.eqs_state) = %(full)s,
+        last_play_id = EXCLUDED.last_play_id
+    WHERE NOT s.finished
+    RETURNING eqs_state, finished, last_play_id
+), counter AS (
+    UPDATE {player} SET play_count = play_count + 1 WHERE id = %(player)s
+)
+INSERT INTO {play} (id, player_id, game_id, equality, is_valid, error_type, results, eqs_state, finished, created)
+SELECT state.last_play_id, %(player)s, %(game)s, %(equality)s, %(is_valid)s, %(error_type)s, %(results)s,
+       state.eqs_state, state.finished, %(created)s
+FROM state
+RETURNING id, eqs_state, finished
+"""
+
+SAVE_INVALID_PLAY_SQL = """
+WITH counter AS (
+    UPDATE {player} SET play_count = play_count + 1 WHERE id = %(player)s
+)
+INSERT INTO {play} (player_id, game_id, equality, is_valid, error_type, results, eqs_state, finished, created)
+SELECT %(player)s, %(game)s, %(equality)s, %(is_valid)s, %(error_type)s, %(results)s, NULL, false, %(created)s
+WHERE NOT EXISTS (
+    SELECT 1 FROM {state} WHERE player_id = %(player)s AND game_id = %(game)s AND finished
+)
+RETURNING id, eqs_state, finished
+"""
+
+
+class ArchivedPlay(models.Model):
+    # Jugadas de juegos terminados (manage.py archive_plays). Conserva el id
+    # original y usa la misma codificación compacta que Play.
+    id = models.BigIntegerField(primary_key=True)
+    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    equality = models.CharField(max_length=20, blank=True, null=True)
+    is_valid = models.BooleanField(default=True)
+    error_type = models.CharField(max_length=1, choices=ERROR_TYPES, null=True, default=None)
+
+    results = PackedResultsField(blank=True, null=True)
+    eqs_state = BitmaskField(blank=True, null=True)
+
+    finished = models.BooleanField(default=False)
+    created = models.DateTimeField()
 
     def __str__(self):
         return f'{self.player} - {self.game} - {self.created}'
 
+    @classmethod
+    def from_play(cls, play):
+        return cls(id=play.id, player_id=play.player_id, game_id=play.game_id, equality=play.equality,
+                   is_valid=play.is_valid, error_type=play.error_type,
+                   results=play.results, eqs_state=play.eqs_state,
+                   finished=play.finished, created=play.created)
+
+
+class PlayerGameState(models.Model):
+    # Estado materializado de un jugador en un juego: se actualiza en la misma
+    # transacción en que se registra una jugada válida o se resetea el juego.
+    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    plays_count = models.IntegerField(default=0)
+    eqs_state = BitmaskField(blank=True, null=True)
+    finished = models.BooleanField(default=False)
+    last_play = models.ForeignKey(Play, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    # Último reset del jugador en el juego: las jugadas creadas antes que
+    # todavía estén en la cola de write_behind se descartan al insertarse
+    reset_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'game'], name='unique_player_game_state'),
+        ]
+
+    def __str__(self):
+        return f'{self.player} - {self.game} - {self.plays_count}'
+
+    @classmethod
+    def for_update(cls, player, game):
+        # Debe llamarse dentro de transaction.atomic()
+        state, _ = cls.objects.select_for_update().get_or_create(player=player, game=game)
+        return state
+
+    def record_play(self, play):
+        self.record_plays([play])
+
+    def record_plays(self, plays):
+        # plays: jugadas válidas ya guardadas, en orden
+        if not plays:
+            return
+        self.plays_count += len(plays)
+        self.eqs_state = plays[-1].eqs_state
+        self.finished = plays[-1].finished
+        self.last_play = plays[-1]
+        self.save(update_fields=['plays_count', 'eqs_state', 'finished', 'last_play'])
+
+    def merge_plays(self, plays):
+        # Como record_plays, pero combina eqs_state con lo guardado (OR) en vez
+        # de reemplazarlo: con write_behind las jugadas pueden llegar de workers
+        # distintos y en cualquier orden respecto de otros flushes
+        if not plays:
+            return
+        merged = self.eqs_state
+        for play in plays:
+            if play.eqs_state is None:
+                continue
+            merged = play.eqs_state if merged is None else [a or b for a, b in zip(merged, play.eqs_state)]
+        self.plays_count += len(plays)
+        self.eqs_state = merged
+        self.finished = bool(merged) and all(merged)
+        self.last_play = plays[-1]
+        self.save(update_fields=['plays_count', 'eqs_state', 'finished', 'last_play'])
+
+
+class PlayJournalSegment(models.Model):
+    # Segmento del journal de write_behind ya insertado: se crea en la misma
+    # transacción que sus jugadas, así reprocesar el archivo no las duplica.
+    name = models.CharField(max_length=200, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PooledEquation(models.Model):
+    # Igualdad pregenerada y validada para una configuración. Se entrega a un
+    # solo juego (drawn); la restricción única impide volver a generarla.
+    eq_length = models.IntegerField()
+    operators = models.CharField(max_length=10)
+    equality = models.CharField(max_length=20)
+    drawn = models.BooleanField(default=False)
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    created = models.DateTimeField(auto_now_add=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['eq_length', 'operators', 'equality'], name='unique_pooled_equation'),
+        ]
+        indexes = [
+            models.Index(fields=['eq_length', 'operators', 'id'],
+                         condition=models.Q(drawn=False),
+                         name='pooled_equation_available_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.eq_length} [{self.operators}] {self.equality}'
+
+    @classmethod
+    def available(cls, eq_length, operators):
+        return cls.objects.filter(eq_length=eq_length, operators=operators_key(operators), drawn=False)
+
+    @classmethod
+    def draw(cls, eq_length, operators, count, game=None, exclude=()):
+        # Debe llamarse dentro de transaction.atomic(). skip_locked: dos juegos
+        # creados a la vez se llevan filas distintas sin esperarse.
+        if count <= 0:
+            return []
+        rows = list(cls.available(eq_length, operators)
+                    .exclude(equality__in=exclude)
+                    .select_for_update(skip_locked=True)
+                    .order_by('id')
+                    .values_list('id', 'equality')[:count])
+        cls.objects.filter(id__in=[row_id for row_id, _ in rows]).update(drawn=True, game=game)
+        return [equality for _, equality in rows]
+
+    @classmethod
+    def claim(cls, eq_length, operators, equalities, game=None):
+        # Marca como entregadas igualdades generadas fuera del pool y devuelve
+        # las que se pudieron tomar: las ya entregadas a otro juego se
+        # descartan. Debe llamarse dentro de transaction.atomic().
+        operators = operators_key(operators)
+        rows = cls.objects.filter(eq_length=eq_length, operators=operators, equality__in=equalities)
+        taken = set(rows.filter(drawn=True).values_list('equality', flat=True))
+        rows.filter(drawn=False).update(drawn=True, game=game)
+        cls.objects.bulk_create([cls(eq_length=eq_length, operators=operators, equality=e, drawn=True, game=game)
+                                 for e in equalities if e not in taken], ignore_conflicts=True)
+        if game is not None:
+            # Otro juego pudo tomar alguna entre medio (ignore_conflicts no avisa)
+            mine = set(rows.filter(game=game).values_list('equality', flat=True))
+            return [e for e in equalities if e in mine]
+        return [e for e in equalities if e not in taken]
+
 
 class Tournament(models.Model):
     name = models.CharField(max_length=200)
@@ -261,6 +568,8 @@ class Tournament(models.Model):
     players = models.ManyToManyField(
         Player, blank=True, related_name='players'
     )
+    # Límite para los juegos del torneo que no definen el suyo
+    play_rate_limit = models.PositiveIntegerField(blank=True, null=True)
 
     def __str__(self):
         return f'{self.name} - {self.games_count} - {self.players_count}'
@@ -0,0 +1,86 @@
+# Codificación compacta de results/eqs_state para almacenamiento (ver fields.py).
+#
+# results: 1 byte eq_length, 2 bytes cantidad de igualdades y luego cada
+# carácter '0'/'1'/'2' en 2 bits, 4 por byte. Una jugada de 8 símbolos contra
+# una igualdad ocupa 5 bytes en vez de un text[] de ~40.
+
+RESULT_SYMBOLS = '012'
+
+# Tablas de 4 símbolos <-> 1 byte (el primer símbolo en los 2 bits bajos)
+_QUADS = {}
+_BYTE_QUADS = ['????'] * 256
+for _byte in range(256):
+    _values = [_byte >> (2 * _i) & 3 for _i in range(4)]
+    if 3 not in _values:
+        _QUADS[''.join(RESULT_SYMBOLS[v] for v in _values)] = _byte
+        _BYTE_QUADS[_byte] = ''.join(RESULT_SYMBOLS[v] for v in _values)
+
+
+def pack_results(results):
+    if results is None:
+        return None
+    eq_length = len(results[0]) if results else 0
+    if any(len(result) != eq_length for result in results):
+        raise ValueError(f'Resultados de distinto largo: {results}')
+    symbols = ''.join(results)
+    symbols += '0' * (-len(symbols) % 4)
+    try:
+        body = bytes([_QUADS[symbols[i:i + 4]] for i in range(0, len(symbols), 4)])
+    except KeyError:
+        raise ValueError(f'Símbolo de resultado inválido en {results}')
+    return bytes([eq_length]) + len(results).to_bytes(2, 'big') + body
+
+
+def unpack_results(data):
+    if data is None:
+        return None
+    data = bytes(data)
+    eq_length = data[0]
+    count = int.from_bytes(data[1:3], 'big')
+    symbols = ''.join([_BYTE_QUADS[b] for b in data[3:]])
+    return [symbols[j * eq_length:(j + 1) * eq_length] for j in range(count)]
+
+
+# Lista de booleanos como 2 bytes de cantidad y un bit por valor. Es el formato
+# con que se archivaba eqs_state antes de BitmaskField (migración 0008).
+def pack_bools(values):
+    if values is None:
+        return None
+    packed = bytearray(len(values).to_bytes(2, 'big'))
+    packed.extend(bytes((len(values) + 7) // 8))
+    for i, value in enumerate(values):
+        if value:
+            packed[2 + i // 8] |= 1 << (i % 8)
+    return bytes(packed)
+
+
+def unpack_bools(data):
+    if data is None:
+        return None
+    data = bytes(data)
+    count = int.from_bytes(data[:2], 'big')
+    return [bool(data[2 + i // 8] >> (i % 8) & 1) for i in range(count)]
+
+
+# eqs_state como entero: un bit por igualdad más un bit centinela sobre el
+# último, que guarda la cantidad (sin él se perderían los False finales).
+# Cabe en un bigint hasta MASK_MAX_LENGTH igualdades.
+MASK_MAX_LENGTH = 62
+
+
+def bools_to_mask(values):
+    if values is None:
+        return None
+    if len(values) > MASK_MAX_LENGTH:
+        raise ValueError(f'A lo más {MASK_MAX_LENGTH} igualdades en una máscara: {len(values)}')
+    mask = 1 << len(values)
+    for i, value in enumerate(values):
+        if value:
+            mask |= 1 << i
+    return mask
+
+
+def mask_to_bools(mask):
+    if mask is None:
+        return None
+    return [bool(mask >> i & 1) for i in range(mask.bit_length() - 1)]
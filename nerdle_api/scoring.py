@@ -0,0 +1,92 @@
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy es opcional
+    np = None
+
+
+# Desde este tamaño de lote conviene el backend vectorizado (si numpy está instalado)
+NUMPY_MIN_BATCH = 256
+
+
+def score(play, equality):
+    # '2' posición exacta, '1' símbolo presente en otra posición, '0' no presente
+    r = ['_'] * len(equality)
+    remaining = {}
+    for pos, c in enumerate(play):
+        e = equality[pos]
+        if c == e:
+            r[pos] = '2'
+        else:
+            remaining[e] = remaining.get(e, 0) + 1
+    for pos, e in enumerate(equality[len(play):], len(play)):
+        remaining[e] = remaining.get(e, 0) + 1
+
+    seen = {}
+    for pos, c in enumerate(play):
+        if r[pos] == '2':
+            continue
+        count = seen.get(c, 0) + 1
+        seen[c] = count
+        r[pos] = '1' if count <= remaining.get(c, 0) else '0'
+    return ''.join(r)
+
+
+def reference_score(play, equality):
+    # Implementación original de Game.__analyze_equality (cuadrática): sólo
+    # como referencia para los tests y el benchmark
+    r = list('_' * len(equality))
+    play_aux = list(play)
+    equality_aux = list(equality)
+    for pos, c in enumerate(play):
+        if c == equality[pos]:
+            r[pos] = '2'
+            equality_aux[pos] = '_'
+            play_aux[pos] = '_'
+    for pos, c in enumerate(play_aux):
+        if c != '_':
+            if c in equality_aux and \
+                    sum([1 if x == c else 0 for x in play_aux[:pos + 1]]) <= sum(
+                    [1 if x == c else 0 for x in equality_aux]):
+                r[pos] = '1'
+            else:
+                r[pos] = '0'
+    return ''.join(r)
+
+
+def score_many(plays, equalities):
+    return [[score(play, eq) for eq in equalities] for play in plays]
+
+
+def score_many_numpy(plays, equalities):
+    if np is None:
+        raise ImportError('numpy is required for the vectorized scoring backend')
+    if not plays or not equalities:
+        return [[] for _ in plays]
+
+    length = len(equalities[0])
+    if any(len(p) != length for p in plays) or any(len(e) != length for e in equalities):
+        return score_many(plays, equalities)
+
+    symbols = sorted(set(''.join(plays)) | set(''.join(equalities)))
+    code = {s: i for i, s in enumerate(symbols)}
+    n_symbols = len(symbols)
+
+    play_codes = np.array([[code[c] for c in p] for p in plays], dtype=np.int16)   # (P, n)
+    eq_codes = np.array([[code[c] for c in e] for e in equalities], dtype=np.int16)  # (T, n)
+
+    exact = play_codes[:, None, :] == eq_codes[None, :, :]  # (P, T, n)
+    open_ = ~exact
+
+    # Símbolos de la igualdad objetivo que no fueron acertados en su posición
+    eq_onehot = eq_codes[:, :, None] == np.arange(n_symbols)[None, None, :]  # (T, n, S)
+    remaining = (eq_onehot[None, :, :, :] & open_[:, :, :, None]).sum(axis=2)  # (P, T, S)
+
+    # Conteo acumulado de cada símbolo jugado en posiciones no exactas
+    play_onehot = play_codes[:, :, None] == np.arange(n_symbols)[None, None, :]  # (P, n, S)
+    seen = np.cumsum(play_onehot[:, None, :, :] & open_[:, :, :, None], axis=2)  # (P, T, n, S)
+    index = np.broadcast_to(play_codes[:, None, :, None], seen.shape[:3] + (1,))
+    seen_own = np.take_along_axis(seen, index, axis=3)[..., 0]  # (P, T, n)
+    remaining_own = np.take_along_axis(remaining, np.broadcast_to(play_codes[:, None, :], exact.shape), axis=2)
+
+    cells = np.where(exact, 2, np.where(seen_own <= remaining_own, 1, 0)).astype(np.uint8) + ord('0')
+    return np.ascontiguousarray(cells).view(f'S{length}')[..., 0].astype(str).tolist()
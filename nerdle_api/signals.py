@@ -0,0 +1,65 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from nerdle_api import standings, throttling
+from nerdle_api.game_cache import invalidate_game, invalidate_open_games
+from nerdle_api.models import Game, Tournament
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def game_changed(sender, instance, **kwargs):
+    invalidate_game(instance.id)
+    invalidate_open_games()
+    throttling.invalidate_game_limits([instance.id])
+
+
+@receiver(post_save, sender=Game)
+@receiver(pre_delete, sender=Game)
+def game_standings_changed(sender, instance, **kwargs):
+    # pre_delete: la relación con los torneos todavía existe
+    standings.invalidate_game(instance.id)
+
+
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def tournament_changed(sender, instance, **kwargs):
+    standings.invalidate_tournament(instance.id)
+
+
+@receiver(post_save, sender=Tournament)
+@receiver(pre_delete, sender=Tournament)
+def tournament_limits_changed(sender, instance, **kwargs):
+    # pre_delete: la relación con los juegos todavía existe
+    throttling.invalidate_game_limits(instance.games.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Tournament.games.through)
+def tournament_games_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:  # instance es un Game
+        game_ids = [instance.id]
+        tournament_ids = pk_set or instance.tournaments.values_list('id', flat=True)
+    else:
+        tournament_ids = [instance.id]
+        game_ids = pk_set or instance.games.values_list('id', flat=True)
+
+    for tournament_id in tournament_ids:
+        standings.invalidate_tournament(tournament_id)
+    for game_id in game_ids:
+        standings.forget_game_tournaments(game_id)
+    throttling.invalidate_game_limits(game_ids)
+
+
+@receiver(m2m_changed, sender=Tournament.players.through)
+def tournament_players_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:  # instance es un Player
+        tournament_ids = pk_set or instance.players.values_list('id', flat=True)
+    else:
+        tournament_ids = [instance.id]
+
+    for tournament_id in tournament_ids:
+        standings.invalidate_tournament(tournament_id)
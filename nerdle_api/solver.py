@@ -0,0 +1,234 @@
+import math
+import random
+from collections import Counter
+from multiprocessing import Pool
+
+from nerdle_api.equation_index import enumerate_equations, get_index, operators_key
+from nerdle_api.models import ArchivedPlay, Play
+from nerdle_api.scoring import np, score
+
+
+# Solver de referencia: mantiene las igualdades del espacio (eq_length,
+# operators) que siguen siendo consistentes con el feedback recibido y elige
+# la jugada que maximiza la información esperada. Con numpy el espacio es una
+# matriz (N, eq_length) y el feedback se calcula vectorizado como un entero en
+# base 3; sin numpy se usa score() sobre listas.
+
+SYMBOLS = '0123456789+-*/^%='
+
+# Cuántas jugadas candidatas y cuántas igualdades restantes (muestra) se
+# evalúan al buscar la mejor jugada
+BEST_GUESS_MAX_GUESSES = 300
+BEST_GUESS_MAX_SAMPLE = 4000
+
+_tables = {}
+
+
+def load_table(eq_length, operators):
+    # Todas las igualdades de la configuración: desde el índice en disco si
+    # existe (sin copiar, vía mmap) o enumerándolas. Se guarda por proceso.
+    config = (eq_length, operators_key(operators))
+    table = _tables.get(config)
+    if table is None:
+        index = get_index(eq_length, config[1])
+        if index is not None and np is not None:
+            table = _tables[config] = index.as_array()
+        else:
+            equalities = sorted(index) if index is not None else sorted(enumerate_equations(*config))
+            if np is not None:
+                table = np.frombuffer(''.join(equalities).encode('ascii'), dtype=np.uint8) \
+                    .reshape(len(equalities), eq_length)
+            else:
+                table = equalities
+            _tables[config] = table
+    return table
+
+
+def feedback_code(feedback):
+    # '2'/'1'/'0' por posición -> entero en base 3 (posición 0 = dígito menos significativo)
+    return sum(int(c) * 3 ** i for i, c in enumerate(feedback))
+
+
+if np is not None:
+    _SYMBOL_CODES = np.zeros(256, dtype=np.uint8)
+    for _i, _s in enumerate(SYMBOLS):
+        _SYMBOL_CODES[ord(_s)] = _i
+
+
+def feedback_codes(guess, table):
+    # score(guess, eq) para cada fila de table (uint8 ASCII), como feedback_code
+    codes = _SYMBOL_CODES[table]
+    guess_codes = _SYMBOL_CODES[np.frombuffer(guess.encode('ascii'), dtype=np.uint8)]
+    rows = np.arange(len(table))
+
+    exact = codes == guess_codes[None, :]
+    remaining = np.zeros((len(table), len(SYMBOLS)), dtype=np.int8)
+    for pos in range(table.shape[1]):
+        remaining[rows, codes[:, pos]] += ~exact[:, pos]
+
+    result = np.zeros(len(table), dtype=np.int32)
+    seen = np.zeros((len(table), len(SYMBOLS)), dtype=np.int8)
+    weight = 1
+    for pos, symbol in enumerate(guess_codes):
+        open_ = ~exact[:, pos]
+        seen[:, symbol] += open_
+        present = open_ & (seen[:, symbol] <= remaining[:, symbol])
+        result += weight * (2 * exact[:, pos] + present)
+        weight *= 3
+    return result
+
+
+def entropy(counts):
+    total = sum(counts)
+    return -sum(c / total * math.log2(c / total) for c in counts if c)
+
+
+class Solver:
+
+    def __init__(self, eq_length, operators, table=None):
+        self.eq_length = eq_length
+        self.operators = operators_key(operators)
+        self.table = load_table(eq_length, operators) if table is None else table
+        self.remaining = np.arange(len(self.table)) if np is not None else list(range(len(self.table)))
+
+    def __len__(self):
+        return len(self.remaining)
+
+    def equality(self, i):
+        if np is not None:
+            return self.table[i].tobytes().decode('ascii')
+        return self.table[i]
+
+    @property
+    def candidates(self):
+        return [self.equality(i) for i in self.remaining]
+
+    def copy(self):
+        solver = Solver(self.eq_length, self.operators, table=self.table)
+        solver.remaining = self.remaining
+        return solver
+
+    def apply(self, guess, feedback):
+        # Se queda con las igualdades que habrían dado este feedback
+        if len(guess) != self.eq_length or len(feedback) != self.eq_length:
+            raise ValueError(f'La jugada y el feedback deben tener largo {self.eq_length}')
+        if np is not None:
+            codes = feedback_codes(guess, self.table[self.remaining])
+            self.remaining = self.remaining[codes == feedback_code(feedback)]
+        else:
+            self.remaining = [i for i in self.remaining if score(guess, self.table[i]) == feedback]
+        return len(self.remaining)
+
+    def guess_entropy(self, guess, sample=None):
+        # Información esperada (bits) de jugar 'guess' sobre las igualdades restantes
+        remaining = self.remaining if sample is None else sample
+        if len(remaining) == 0:
+            return 0.0
+        if np is not None:
+            return entropy(np.bincount(feedback_codes(guess, self.table[remaining])).tolist())
+        return entropy(Counter(score(guess, self.table[i]) for i in remaining).values())
+
+    def best_guess(self, max_guesses=BEST_GUESS_MAX_GUESSES, max_sample=BEST_GUESS_MAX_SAMPLE, rng=None):
+        # Entre (una muestra de) las igualdades restantes, la de mayor entropía
+        # esperada, estimada sobre una muestra de a lo más max_sample restantes
+        if len(self.remaining) == 0:
+            return None, 0.0
+        if len(self.remaining) == 1:
+            return self.equality(self.remaining[0]), 0.0
+
+        rng = rng or random.Random(0)
+        remaining = list(self.remaining)
+        guesses = remaining if len(remaining) <= max_guesses else rng.sample(remaining, max_guesses)
+        sample = remaining if len(remaining) <= max_sample else rng.sample(remaining, max_sample)
+        if np is not None:
+            sample = np.array(sample)
+
+        best, best_entropy = None, -1.0
+        for i in guesses:
+            guess = self.equality(i)
+            h = self.guess_entropy(guess, sample)
+            if h > best_entropy:
+                best, best_entropy = guess, h
+        return best, best_entropy
+
+
+def replay(eq_length, operators, targets, plays, best=False, cache=None):
+    # Reproduce las jugadas válidas de un jugador: plays es [(guess, results)]
+    # con results como en Play (un feedback por igualdad del juego). Devuelve
+    # por jugada y por igualdad cuántas candidatas quedaban antes y después.
+    # cache: {historial de feedback: Solver} compartido entre jugadores, así las
+    # mismas aperturas no se vuelven a filtrar sobre el espacio completo.
+    cache = {} if cache is None else cache
+    table = load_table(eq_length, operators)
+    histories = [() for _ in targets]
+    solvers = [Solver(eq_length, operators, table=table) for _ in targets]
+    rows = []
+    for guess, results in plays:
+        row = {'guess': guess, 'targets': []}
+        for t, feedback in enumerate(results):
+            solver = solvers[t]
+            before = len(solver)
+            info = solver.guess_entropy(guess) if before > 1 else 0.0
+            best_guess, best_info = solver.best_guess() if best and before > 1 else (None, None)
+
+            histories[t] += ((guess, feedback),)
+            cached = cache.get(histories[t])
+            if cached is None:
+                solver = solver.copy()
+                solver.apply(guess, feedback)
+                cache[histories[t]] = solver
+            else:
+                solver = cached
+            solvers[t] = solver
+
+            row['targets'].append({
+                'before': before,
+                'after': len(solver),
+                'eliminated': before - len(solver),
+                'expected_bits': info,
+                'best_guess': best_guess,
+                'best_bits': best_info,
+            })
+        rows.append(row)
+    return rows
+
+
+_replay_caches = {}
+
+
+def _replay_player(args, cache=None):
+    # En un proceso del pool el caché de aperturas es por proceso
+    player, eq_length, operators, targets, plays, best = args
+    if cache is None:
+        cache = _replay_caches.setdefault((eq_length, operators_key(operators)), {})
+    return player, replay(eq_length, operators, targets, plays, best=best, cache=cache)
+
+
+def game_plays(game):
+    # Jugadas válidas del juego (vigentes y archivadas) por jugador, en orden.
+    # Por (nombre, id): el nombre no es único y sólo sirve para mostrarlo.
+    by_player = {}
+    for model in (ArchivedPlay, Play):
+        rows = model.objects.filter(game=game, is_valid=True, results__isnull=False) \
+            .order_by('created', 'id') \
+            .values_list('player__name', 'player_id', 'equality', 'results', 'created')
+        for name, player_id, equality, results, created in rows:
+            by_player.setdefault((name, player_id), []).append((created, equality, results))
+    return {player: [(equality, results) for _, equality, results in sorted(plays, key=lambda p: p[0])]
+            for player, plays in by_player.items()}
+
+
+def replay_game(game, best=False, processes=1, cache=None):
+    # {(nombre, id del jugador): filas de replay()}; con processes != 1 se
+    # reparte por jugador. cache: caché de aperturas para esta llamada (sólo
+    # con un proceso); sin él se usa el del proceso, que crece con cada juego
+    # y no se libera nunca.
+    jobs = [(player, game.eq_length, game.operators, game.equalities, plays, best)
+            for player, plays in sorted(game_plays(game).items())]
+    if processes == 1 or len(jobs) <= 1:
+        results = (_replay_player(job, cache) for job in jobs)
+    else:
+        load_table(game.eq_length, game.operators)  # los procesos hijos heredan la tabla
+        with Pool(processes) as pool:
+            results = pool.map(_replay_player, jobs)
+    return dict(results)
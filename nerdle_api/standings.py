@@ -0,0 +1,182 @@
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from nerdle_api.checks import process_local_cache
+from nerdle_api.models import ArchivedPlay, Game, Play, Player, Tournament
+
+
+STANDINGS_CACHE_PREFIX = 'nerdle:standings:'
+STANDINGS_CELL_PREFIX = 'nerdle:standings_cell:'
+GAME_TOURNAMENTS_CACHE_PREFIX = 'nerdle:game_tournaments:'
+# Una celda que se construye desde la BD mientras llega una jugada puede
+# quedar corta en esa jugada: el TTL acota cuánto dura la diferencia.
+STANDINGS_CACHE_TIMEOUT = 300
+# Con un caché por proceso (LocMem) cada worker sólo incrementa sus celdas: la
+# tabla que sirve otro worker se queda atrás hasta que expiran.
+STANDINGS_LOCAL_CACHE_TIMEOUT = 5
+
+
+def standings_timeout():
+    return STANDINGS_LOCAL_CACHE_TIMEOUT if process_local_cache() else STANDINGS_CACHE_TIMEOUT
+
+
+def _valid_plays_stats(plays, game_ids):
+    # Jugadas válidas y estado de la última por (jugador, juego), en dos consultas
+    valid_plays = plays.filter(game__in=game_ids,
+                               results__isnull=False,
+                               is_valid=True)
+    plays_count = {
+        (row['player'], row['game']): row['plays']
+        for row in valid_plays.values('player', 'game').annotate(plays=Count('id')).order_by()
+    }
+    last_plays = valid_plays.order_by('player', 'game', '-created') \
+        .distinct('player', 'game') \
+        .values_list('player', 'game', 'finished', 'created')
+    last = {(player_id, game_id): (created, finished) for player_id, game_id, finished, created in last_plays}
+    return plays_count, last
+
+
+def build_summary(games, players):
+    game_ids = [g.id for g in games]
+    plays_count, last = _valid_plays_stats(Play.objects, game_ids)
+
+    # Los juegos terminados pueden tener jugadas archivadas: se suman igual
+    now = datetime.now(timezone.utc)
+    ended_ids = [g.id for g in games if g.end < now]
+    if ended_ids:
+        archived_count, archived_last = _valid_plays_stats(ArchivedPlay.objects, ended_ids)
+        for pair, count in archived_count.items():
+            plays_count[pair] = plays_count.get(pair, 0) + count
+        for pair, entry in archived_last.items():
+            if pair not in last or entry[0] > last[pair][0]:
+                last[pair] = entry
+
+    return {
+        p.id: {
+            'name': p.name,
+            'games': {
+                g_id: {'plays': plays_count.get((p.id, g_id), 0),
+                       'finished': last[(p.id, g_id)][1] if (p.id, g_id) in last else False}
+                for g_id in game_ids
+            },
+        }
+        for p in players
+    }
+
+
+def rank(summary, game_ids):
+    # Mismo orden que el resumen del admin: más juegos terminados, luego menos jugadas
+    players_values = []
+    for player_id, p in summary.items():
+        p_vals = {'id': player_id,
+                  'name': p['name'],
+                  'games': [p['games'][g_id] for g_id in game_ids]}
+        p_vals['total'] = sum(g['plays'] for g in p_vals['games'])
+        p_vals['fs'] = len([g for g in p_vals['games'] if g['finished']])
+        players_values.append(p_vals)
+
+    players_values.sort(key=lambda x: (-x['fs'], x['total']))
+    return players_values
+
+
+def standings_cache_key(tournament_id):
+    return f'{STANDINGS_CACHE_PREFIX}{tournament_id}'
+
+
+def cell_cache_key(game_id, player_id):
+    return f'{STANDINGS_CELL_PREFIX}{game_id}:{player_id}'
+
+
+def encode_cell(plays, finished):
+    # Un entero por (juego, jugador): jugadas * 2 + terminado, para que una
+    # jugada sea un solo cache.incr
+    return plays * 2 + (1 if finished else 0)
+
+
+def decode_cell(value):
+    return {'plays': value >> 1, 'finished': bool(value & 1)}
+
+
+def _load_cells(game_ids, player_ids):
+    # Celdas de (juego, jugador) desde el caché; las que faltan se calculan
+    # desde las jugadas de esos juegos y se agregan con add, sin pisar un
+    # incr que haya llegado entre medio
+    keys = {(g_id, p_id): cell_cache_key(g_id, p_id) for g_id in game_ids for p_id in player_ids}
+    cached = cache.get_many(keys.values())
+    missing_games = sorted({g_id for (g_id, _), key in keys.items() if key not in cached})
+    if missing_games:
+        built = build_cells(Game.objects.filter(id__in=missing_games).only('id', 'end'), player_ids)
+        for pair, value in built.items():
+            key = keys[pair]
+            if key not in cached:
+                cache.add(key, value, timeout=standings_timeout())
+                cached[key] = value
+    return {pair: decode_cell(cached[key]) for pair, key in keys.items()}
+
+
+def build_cells(games, player_ids):
+    summary = build_summary(list(games), [Player(id=p_id) for p_id in player_ids])
+    return {(g_id, p_id): encode_cell(cell['plays'], cell['finished'])
+            for p_id, p in summary.items() for g_id, cell in p['games'].items()}
+
+
+def get_standings(tournament_id):
+    # Tabla del torneo: juegos y jugadores (que cambian poco) en una entrada
+    # y los contadores por celda, que se arman al leer
+    key = standings_cache_key(tournament_id)
+    entry = cache.get(key)
+    if entry is None:
+        tournament = Tournament.objects.filter(id=tournament_id).first()
+        if tournament is None:
+            return None
+        entry = {
+            'id': tournament.id,
+            'name': tournament.name,
+            'games': [{'id': g.id, 'name': g.short_name} for g in tournament.games.order_by('id')],
+            'players': list(tournament.players.order_by('name').values_list('id', 'name')),
+        }
+        cache.set(key, entry, timeout=standings_timeout())
+
+    game_ids = [g['id'] for g in entry['games']]
+    cells = _load_cells(game_ids, [p_id for p_id, _ in entry['players']])
+    return dict(entry, players={
+        p_id: {'name': name, 'games': {g_id: cells[(g_id, p_id)] for g_id in game_ids}}
+        for p_id, name in entry['players']
+    })
+
+
+def game_tournament_ids(game_id):
+    key = f'{GAME_TOURNAMENTS_CACHE_PREFIX}{game_id}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(Tournament.objects.filter(games=game_id).values_list('id', flat=True))
+        cache.set(key, ids, timeout=standings_timeout())
+    return ids
+
+
+def record_play(play):
+    # Un incr atómico de la celda (independiente de los torneos); si no está
+    # construida se calcula desde la BD al leer
+    try:
+        cache.incr(cell_cache_key(play.game_id, play.player_id), encode_cell(1, play.finished))
+    except ValueError:
+        pass
+
+
+def reset_player(game_id, player_id):
+    cache.set(cell_cache_key(game_id, player_id), encode_cell(0, False), timeout=standings_timeout())
+
+
+def invalidate_tournament(tournament_id):
+    cache.delete(standings_cache_key(tournament_id))
+
+
+def forget_game_tournaments(game_id):
+    cache.delete(f'{GAME_TOURNAMENTS_CACHE_PREFIX}{game_id}')
+
+
+def invalidate_game(game_id):
+    cache.delete_many([standings_cache_key(t_id) for t_id in game_tournament_ids(game_id)])
+    forget_game_tournaments(game_id)
@@ -1,3 +1,586 @@
-from django.test import TestCase
+import asyncio
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone as dj_timezone
+
+from nerdle_api import db_threads, packing, scoring, throttling, write_behind
+from nerdle_api.scoring import reference_score
+from nerdle_api.expressions import resolve
+from nerdle_api.fields import BitmaskField, PackedResultsField
+from nerdle_api.models import Game, Play, Player, PlayerGameState, PooledEquation
+from nerdle_api.validation import check_equality
+from nerdle_api.views import parse_since, reset_plays
+
+
+def random_strings(rng, count, length, alphabet='0123456789+-*/='):
+    return [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+def random_equalities(rng, count, eq_length, operators):
+    # Igualdades válidas a op b = c del largo pedido
+    equalities = []
+    while len(equalities) < count:
+        a, b = rng.randint(0, 999), rng.randint(1, 99)
+        op = rng.choice(operators)
+        value = {'+': a + b, '-': a - b, '*': a * b, '/': a // b}[op]
+        equality = f'{a}{op}{b}={value}'
+        if check_equality(equality, eq_length, operators).is_valid:
+            equalities.append(equality)
+    return equalities
+
+
+class ScoringPropertyTests(SimpleTestCase):
+    # Los puntajes optimizados deben coincidir con el original cuadrático
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def cases(self, length):
+        plays = random_strings(self.rng, 300, length)
+        targets = random_strings(self.rng, 10, length)
+        # Alfabetos pequeños fuerzan símbolos repetidos, el caso difícil del conteo
+        plays += random_strings(self.rng, 300, length, '12=')
+        targets += random_strings(self.rng, 10, length, '12=')
+        return plays, targets
+
+    def test_score_matches_reference(self):
+        for length in (5, 8, 12):
+            plays, targets = self.cases(length)
+            for play in plays:
+                for target in targets:
+                    self.assertEqual(scoring.score(play, target), reference_score(play, target))
+
+    def test_score_many_matches_reference(self):
+        plays, targets = self.cases(8)
+        expected = [[reference_score(p, t) for t in targets] for p in plays]
+        self.assertEqual(scoring.score_many(plays, targets), expected)
+
+    def test_score_many_numpy_matches_reference(self):
+        if scoring.np is None:
+            self.skipTest('numpy no está instalado')
+        for length in (5, 8, 12):
+            plays, targets = self.cases(length)
+            expected = [[reference_score(p, t) for t in targets] for p in plays]
+            self.assertEqual(scoring.score_many_numpy(plays, targets), expected)
+
+
+class EvaluateManyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = random.Random(1)
+        self.game = Game(eq_length=8, eq_count=5, operators='+-*/',
+                         equalities=random_equalities(self.rng, 5, 8, '+-*/'))
+
+    def test_valid_plays_match_reference(self):
+        plays = random_equalities(self.rng, 200, 8, '+-*/')
+        expected = [[reference_score(p, t) for t in self.game.equalities] for p in plays]
+        backends = ['python'] + (['numpy'] if scoring.np is not None else [])
+        for backend in backends:
+            self.assertEqual(self.game.evaluate_many(plays, backend=backend), expected)
+
+    def test_invalid_plays_are_none(self):
+        plays = [
+            '12+35=47',             # válida
+            '12+35=470',            # largo
+            '1=print("EVALUATED")',  # símbolos (no se evalúa)
+            '12+35=48',             # no es igualdad
+            '2^3^1=8',              # más de un elevado
+            '12+35+47',             # sin '='
+            '1+1=2=11',             # más de un '='
+        ]
+        results = self.game.evaluate_many(plays)
+        self.assertIsNotNone(results[0])
+        self.assertEqual(results[1:], [None] * (len(plays) - 1))
+
+    def test_invalid_plays_are_none_for_random_strings(self):
+        plays = random_strings(self.rng, 500, 8)
+        for play, result in zip(plays, self.game.evaluate_many(plays)):
+            if check_equality(play, 8, '+-*/').is_valid:
+                self.assertEqual(result, [reference_score(play, t) for t in self.game.equalities])
+            else:
+                self.assertIsNone(result)
+
+
+class ParseSinceTests(SimpleTestCase):
+
+    def test_timestamp_and_iso(self):
+        expected = datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.assertEqual(parse_since(str(expected.timestamp())), expected)
+        self.assertEqual(parse_since('2023-01-02T03:04:05'), expected)
+
+    def test_out_of_range_is_none(self):
+        # Antes escapaba como 500
+        self.assertIsNone(parse_since('99999999999999999'))
+        self.assertIsNone(parse_since('9' * 400))
+        self.assertIsNone(parse_since('2023-13-45T00:00:00'))
+
+
+def eval_resolve(operation):
+    # El camino original con eval, como referencia
+    try:
+        return eval(operation.replace('/', '//').replace('^', '**'))
+    except Exception:
+        return None
+
+
+class ResolveTests(SimpleTestCase):
+    # El parser debe dar lo mismo que eval en todo lo que puede llegarle
+
+    def test_random_expressions_match_eval(self):
+        rng = random.Random(2)
+        for _ in range(3000):
+            parts = [str(rng.randint(0, 999))]
+            for _ in range(rng.randint(0, 3)):
+                parts.append(rng.choice(['+', '-', '*', '/', '%', '^', '']))
+                parts.append(str(rng.randint(0, 99)))
+            expression = ''.join(parts)
+            if expression.count('^') <= 1:
+                self.assertEqual(resolve(expression), eval_resolve(expression), expression)
+
+    def test_random_strings_match_eval(self):
+        rng = random.Random(3)
+        for expression in random_strings(rng, 3000, 6, '0123456789+-*/%'):
+            self.assertEqual(resolve(expression), eval_resolve(expression), expression)
+
+    def test_edge_cases_match_eval(self):
+        cases = ['', '0', '00', '007', '1+', '+1', '-1', '--1', '1--1', '2*-3', '7/0', '7%0',
+                 '-7/2', '-7%2', '2^-1', '2^3', '1+2*3-4', '10/3*3', '**2', '1//2', '1***2', 'a+1']
+        for expression in cases:
+            self.assertEqual(resolve(expression), eval_resolve(expression), expression)
+
+    def test_huge_literal_is_none(self):
+        self.assertIsNone(resolve('1' * 5000))
+        self.assertIsNone(resolve('1+' + '1' * 5000))
+
+    def test_wrong_length_is_not_evaluated(self):
+        equality = '1' * 5000 + '=1'
+        check = check_equality(equality, 8, '+-*/', all_errors=True)
+        self.assertEqual(check.errors, ['L'])
+        self.assertIsNone(check.balanced)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+class FakeClock:
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PLAY_RATE_LIMIT=60, PLAY_RATE_BURST=3, PLAY_DEDUP_SECONDS=5)
+class ThrottlingTests(SimpleTestCase):
+    # El límite de cada juego se deja en el caché para no tocar la BD
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = mock.patch('nerdle_api.throttling.time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_limit(self, game_id, per_minute):
+        cache.set(throttling.game_limit_key(game_id), per_minute)
+
+    def test_refill(self):
+        # 60/min = 1 token por segundo, hasta capacity
+        state, allowed, _ = throttling._refill((0, 100.0), 60, 3, 1, 100.5)
+        self.assertFalse(allowed)
+        state, allowed, retry_after = throttling._refill(state, 60, 3, 1, 100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 0.5)
+        state, allowed, _ = throttling._refill(state, 60, 3, 1, 101.0)
+        self.assertTrue(allowed)
+        state, _, _ = throttling._refill(state, 60, 3, 0, 1000.0)
+        self.assertEqual(state[0], 3)
+
+    def test_bucket_exhaustion_and_refill(self):
+        self.set_limit(1, 60)
+        self.assertEqual([throttling.take('K', 1)[0] for _ in range(3)], [True, True, True])
+        allowed, retry_after = throttling.take('K', 1)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 1)
+        self.clock.now += 1
+        self.assertTrue(throttling.take('K', 1)[0])
+        self.assertFalse(throttling.take('K', 1)[0])
+
+    def test_buckets_are_per_key_and_game(self):
+        self.set_limit(1, 60)
+        self.set_limit(2, 60)
+        for _ in range(3):
+            throttling.take('K', 1)
+        self.assertFalse(throttling.take('K', 1)[0])
+        self.assertTrue(throttling.take('K', 2)[0])
+        self.assertTrue(throttling.take('OTRA', 1)[0])
+
+    def test_per_game_limits(self):
+        self.set_limit(1, 6)    # un token cada 10 s
+        self.set_limit(2, 0)    # sin límite
+        for _ in range(3):
+            throttling.take('K', 1)
+        self.clock.now += 5
+        allowed, retry_after = throttling.take('K', 1)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 5)
+        self.assertTrue(all(throttling.take('K', 2)[0] for _ in range(50)))
+
+    def test_dedup_replays_stored_response(self):
+        key = throttling.play_response_key('K', '1', '1+1=2', False)
+        self.assertIsNone(throttling.begin_play(key))
+        # Una igual mientras la primera está en curso
+        self.assertEqual(throttling.begin_play(key).status_code, 429)
+        throttling.finish_play(key, HttpResponse('{"result": 1}', content_type='application/json'))
+        response = throttling.begin_play(key)
+        self.assertEqual((response.status_code, response.content), (200, b'{"result": 1}'))
+
+    def test_dedup_does_not_store_failures(self):
+        key = throttling.play_response_key('K', '1', '1+1=2', False)
+        for response in (None, HttpResponse(status=500), throttling.too_many_requests(1)):
+            self.assertIsNone(throttling.begin_play(key))
+            throttling.finish_play(key, response)
+        self.assertIsNone(throttling.begin_play(key))
+
+    def test_reset_starts_a_new_generation(self):
+        key = throttling.play_response_key('K', '1', '1+1=2', False)
+        throttling.begin_play(key)
+        throttling.finish_play(key, HttpResponse('antes'))
+        throttling.new_generation('K', 1)
+        after = throttling.play_response_key('K', '1', '1+1=2', False)
+        self.assertNotEqual(after, key)
+        self.assertIsNone(throttling.begin_play(after))
+        self.assertEqual(throttling.play_response_key('OTRA', '1', '1+1=2', False),
+                         throttling._play_response_key('OTRA', '1', '1+1=2', False, 0))
+
+
+class PackingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = random.Random(4)
+
+    def test_results_round_trip(self):
+        cases = [[], ['2'], ['0120'], ['22222222'], ['01201201', '22222222', '00000000']]
+        for count in (1, 3, 7, 62):
+            for length in (5, 8, 10, 12):
+                cases.append(random_strings(self.rng, count, length, '012'))
+        for results in cases:
+            packed = packing.pack_results(results)
+            self.assertIsInstance(packed, bytes)
+            self.assertEqual(packing.unpack_results(packed), results)
+            self.assertEqual(packing.unpack_results(memoryview(packed)), results)
+        self.assertEqual(len(packing.pack_results(['01201201'])), 5)
+        self.assertIsNone(packing.pack_results(None))
+        self.assertIsNone(packing.unpack_results(None))
+
+    def test_invalid_results(self):
+        with self.assertRaises(ValueError):
+            packing.pack_results(['012', '0123'])
+        with self.assertRaises(ValueError):
+            packing.pack_results(['0130'])
+
+    def bools_cases(self):
+        cases = [[], [False], [True], [False] * 62, [True] * 62, [True, False, False]]
+        cases += [[self.rng.random() < 0.5 for _ in range(n)] for n in range(1, 63) for _ in range(5)]
+        return cases
+
+    def test_mask_round_trip_keeps_trailing_false(self):
+        for values in self.bools_cases():
+            mask = packing.bools_to_mask(values)
+            # Bit centinela sobre el último valor: la cantidad no se pierde
+            self.assertEqual(mask.bit_length(), len(values) + 1)
+            self.assertLess(mask, 2 ** 63)
+            self.assertEqual(packing.mask_to_bools(mask), values)
+        self.assertEqual(packing.bools_to_mask([]), 1)
+        self.assertEqual(packing.bools_to_mask([True, False, False]), 0b1001)
+        self.assertIsNone(packing.bools_to_mask(None))
+        self.assertIsNone(packing.mask_to_bools(None))
+
+    def test_mask_too_long(self):
+        with self.assertRaises(ValueError):
+            packing.bools_to_mask([False] * (packing.MASK_MAX_LENGTH + 1))
+
+    def test_archived_bools_round_trip(self):
+        # Los pasos de la migración 0008 para ArchivedPlay, ida y vuelta
+        for values in self.bools_cases():
+            packed = packing.pack_bools(values)
+            self.assertEqual(packing.unpack_bools(packed), values)
+            mask = packing.bools_to_mask(packing.unpack_bools(packed))
+            self.assertEqual(packing.pack_bools(packing.mask_to_bools(mask)), packed)
+
+
+class CompactFieldTests(SimpleTestCase):
+
+    def test_packed_results_field(self):
+        field = PackedResultsField(null=True)
+        results = ['01201201', '22222222']
+        packed = packing.pack_results(results)
+        # psycopg2 lo envuelve en Binary: el valor original queda en adapted
+        self.assertEqual(field.get_db_prep_value(results, connection).adapted, packed)
+        self.assertEqual(field.from_db_value(memoryview(packed), None, connection), results)
+        self.assertIsNone(field.from_db_value(None, None, connection))
+        self.assertIsNone(field.get_db_prep_value(None, connection))
+        self.assertEqual(field.to_python('012,210'), ['012', '210'])
+        self.assertEqual(field.to_python(packing.pack_results(results)), results)
+
+    def test_bitmask_field(self):
+        field = BitmaskField(null=True)
+        values = [True, False, True, False, False]
+        mask = field.get_prep_value(values)
+        self.assertEqual(mask, packing.bools_to_mask(values))
+        self.assertEqual(field.from_db_value(mask, None, connection), values)
+        self.assertEqual(field.get_prep_value(mask), mask)
+        self.assertIsNone(field.get_prep_value(None))
+        self.assertIsNone(field.from_db_value(None, None, connection))
+        self.assertEqual(field.to_python('1,0,1,0,0'), values)
+        self.assertEqual(field.to_python(mask), values)
+
+
+def make_game(**kwargs):
+    now = dj_timezone.now()
+    fields = dict(start=now, end=now + timedelta(days=1), eq_length=8, eq_count=3, operators='+-*/')
+    fields.update(kwargs)
+    return Game.objects.create(**fields)
+
+
+class PoolClaimTests(TestCase):
+    # Con el pool vacío las igualdades generadas quedan registradas como entregadas
+
+    def test_fallback_equalities_are_not_repeated(self):
+        first = make_game()
+        first.create_equalities()
+        self.assertEqual(len(first.equalities), 3)
+        self.assertEqual(set(PooledEquation.objects.filter(game=first, drawn=True)
+                             .values_list('equality', flat=True)), set(first.equalities))
+
+        # El generador devuelve primero las del otro juego: se descartan
+        fresh = random_equalities(random.Random(5), 6, 8, '+-*/')
+        fresh = [eq for eq in fresh if eq not in first.equalities][:3]
+        second = make_game()
+        with mock.patch.object(Game, 'generate_equalities', side_effect=[first.equalities, fresh]):
+            second.create_equalities()
+        self.assertEqual(second.equalities, fresh)
+
+    def test_claim_takes_available_pool_rows(self):
+        game = make_game()
+        PooledEquation.objects.create(eq_length=8, operators='*+-/', equality='12+35=47')
+        self.assertEqual(PooledEquation.claim(8, '+-*/', ['12+35=47'], game=game), ['12+35=47'])
+        self.assertTrue(PooledEquation.objects.get(equality='12+35=47').drawn)
+        other = make_game()
+        self.assertEqual(PooledEquation.claim(8, '+-*/', ['12+35=47'], game=other), [])
+
+
+class SaveWithStateTests(TestCase):
+    # Play.save_with_state: contador, estado y jugada en una sola sentencia
+
+    def setUp(self):
+        self.game = make_game(equalities=['12+35=47', '30-12=18', '9*8+1=73'])
+        self.player = Player.objects.create(name='Ana', key='K1')
+
+    def play(self, equality):
+        play, _ = self.game.build_play(self.player, equality)
+        return play, play.save_with_state()
+
+    def state(self):
+        return PlayerGameState.objects.get(player=self.player, game=self.game)
+
+    def play_count(self):
+        self.player.refresh_from_db()
+        return self.player.play_count
+
+    def test_first_play(self):
+        play, saved = self.play('12+35=47')
+        self.assertTrue(saved)
+        self.assertIsNotNone(play.id)
+        self.assertEqual((play.eqs_state, play.finished), ([True, False, False], False))
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state, state.finished, state.last_play_id),
+                         (1, [True, False, False], False, play.id))
+        stored = Play.objects.get(id=play.id)
+        self.assertEqual((stored.results, stored.eqs_state, stored.is_valid),
+                         (play.results, [True, False, False], True))
+        self.assertEqual(self.play_count(), 1)
+
+    def test_masks_are_ored(self):
+        self.play('12+35=47')
+        # build_play sin estado previo: el OR con lo guardado lo hace la BD
+        play, saved = self.play('30-12=18')
+        self.assertTrue(saved)
+        self.assertEqual((play.eqs_state, play.finished), ([True, True, False], False))
+        play, _ = self.play('12+35=47')
+        self.assertEqual(play.eqs_state, [True, True, False])
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state, state.last_play_id), (3, [True, True, False], play.id))
+        self.assertEqual(Play.objects.get(id=play.id).eqs_state, [True, True, False])
+
+    def test_finishing_play(self):
+        self.play('12+35=47')
+        self.play('30-12=18')
+        play, saved = self.play('9*8+1=73')
+        self.assertTrue(saved)
+        self.assertEqual((play.eqs_state, play.finished), ([True, True, True], True))
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state, state.finished), (3, [True, True, True], True))
+        self.assertTrue(Play.objects.get(id=play.id).finished)
+
+    def test_plays_after_finish_only_count(self):
+        for equality in ('12+35=47', '30-12=18', '9*8+1=73'):
+            self.play(equality)
+        plays = Play.objects.count()
+        for equality in ('12+35=48', '12+35=47'):
+            play, saved = self.play(equality)
+            self.assertFalse(saved)
+            self.assertIsNone(play.id)
+        self.assertEqual(Play.objects.count(), plays)
+        self.assertEqual(self.state().plays_count, 3)
+        self.assertEqual(self.play_count(), 5)
+
+    def test_invalid_play_keeps_state(self):
+        self.play('12+35=47')
+        play, saved = self.play('12+35=48')
+        self.assertTrue(saved)
+        stored = Play.objects.get(id=play.id)
+        self.assertEqual((stored.is_valid, stored.error_type, stored.eqs_state, stored.finished),
+                         (False, 'I', None, False))
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state), (1, [True, False, False]))
+        self.assertEqual(self.play_count(), 2)
+
+    def test_invalid_first_play_creates_no_state(self):
+        _, saved = self.play('1+1=3')
+        self.assertTrue(saved)
+        self.assertFalse(PlayerGameState.objects.exists())
+        self.assertEqual(self.play_count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PLAY_WRITE_BEHIND=True, PLAY_FLUSH_INTERVAL=3600, PLAY_FLUSH_BATCH=10 ** 6)
+class WriteBehindResetTests(TransactionTestCase):
+    # Dos colas como dos workers: el thread de cada una inserta con su propia
+    # conexión, así que las jugadas tienen que estar confirmadas
+
+    def setUp(self):
+        cache.clear()
+        self.game = make_game(equalities=['12+35=47', '30-12=18', '9*8+1=73'])
+        self.player = Player.objects.create(name='Ana', key='K1')
+        self.queues = [self.make_queue(), self.make_queue()]
+
+    def make_queue(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        time.sleep(0.002)  # el prefijo del journal lleva el inicio en ms
+        queue = write_behind.PlayQueue(directory.name)
+        self.addCleanup(queue.close)
+        return queue
+
+    def play(self, queue, equality):
+        # Lo que hace submit_play_deferred en el worker de la cola
+        with write_behind.pair_lock(self.player.id, self.game.id):
+            state = write_behind.get_state(self.player, self.game)
+            play, _ = self.game.build_play(self.player, equality, state.eqs_state)
+            queue.put([write_behind.play_record(self.player.id, play)])
+            if play.is_valid:
+                state.plays_count += 1
+                state.eqs_state = play.eqs_state
+                state.finished = play.finished
+                write_behind.set_state(state)
+        return play
+
+    def state(self):
+        return PlayerGameState.objects.get(player=self.player, game=self.game)
+
+    def test_reset_drops_plays_queued_in_other_workers(self):
+        first, second = self.queues
+        for equality in ('12+35=47', '30-12=18', '9*8+1=73'):
+            self.play(first, equality)
+        reset_plays(self.player, self.game)
+        self.assertFalse(write_behind.get_state(self.player, self.game).finished)
+        after = self.play(second, '30-12=18')
+
+        # El worker que reseteó inserta primero y el otro después del reset
+        second.flush()
+        first.flush()
+
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state, state.finished), (1, [False, True, False], False))
+        self.assertEqual(list(Play.objects.values_list('equality', 'created')), [('30-12=18', after.created)])
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.play_count, 4)
+
+    def test_plays_flushed_before_reset_are_deleted(self):
+        first, second = self.queues
+        self.play(first, '12+35=47')
+        first.flush()
+        self.play(first, '30-12=18')
+        reset_plays(self.player, self.game)
+        self.play(second, '9*8+1=73')
+        first.flush()
+        second.flush()
+
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state), (1, [False, False, True]))
+        self.assertEqual(list(Play.objects.values_list('equality', flat=True)), ['9*8+1=73'])
+
+    def test_merges_states_from_both_workers(self):
+        # Sin reset, las jugadas de las dos colas se combinan con OR
+        first, second = self.queues
+        self.play(first, '12+35=47')
+        cache.clear()  # el otro worker no ve el estado en caché
+        self.play(second, '30-12=18')
+        second.flush()
+        first.flush()
+        state = self.state()
+        self.assertEqual((state.plays_count, state.eqs_state, state.finished), (2, [True, True, False], False))
+
+
+class DbThreadsTests(TransactionTestCase):
+
+    def setUp(self):
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='db')
+        patcher = mock.patch.object(db_threads, '_executor', pool)
+        patcher.start()
+        self.addCleanup(pool.shutdown)
+        self.addCleanup(self.close_pool_connections, pool)
+        self.addCleanup(patcher.stop)
+
+    def close_pool_connections(self, pool):
+        # Una tarea por thread (la barrera las reparte) para no dejar conexiones abiertas a la BD de tests
+        barrier = threading.Barrier(2)
+
+        def close():
+            barrier.wait(timeout=5)
+            connections.close_all()
+
+        for future in [pool.submit(close) for _ in range(2)]:
+            future.result()
+
+    def test_reuses_one_connection_per_pool_thread(self):
+        def backend():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                return threading.current_thread().name, cursor.fetchone()[0]
+
+        async def many():
+            return await asyncio.gather(*(db_threads.in_db_thread(backend)() for _ in range(20)))
+
+        # Como bajo ASGI: CONN_MAX_AGE 0 no cierra las conexiones del pool
+        with mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            results = async_to_sync(many)()
+
+        threads = {name for name, _ in results}
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('db') for name in threads))
+        self.assertLessEqual(len(threads), 2)
+        self.assertEqual(len({pid for _, pid in results}), len(threads))
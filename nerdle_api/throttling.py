@@ -0,0 +1,182 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.http import HttpResponse
+
+from nerdle_api.models import Game
+
+
+# Token bucket por (key, juego) en el caché compartido. El estado es
+# (tokens, instante) y se lee y escribe sin lock: entre workers concurrentes
+# puede colarse alguna jugada de más, pero no una ráfaga sostenida.
+RATE_LIMIT_PREFIX = 'nerdle:ratelimit:'
+GAME_LIMIT_PREFIX = 'nerdle:ratelimit_game:'
+GAME_LIMIT_CACHE_TIMEOUT = 300
+
+# Respuesta ya calculada de una jugada (key, juego, igualdad) reciente
+PLAY_RESPONSE_PREFIX = 'nerdle:play_response:'
+PLAY_PENDING = 'pending'
+# Generación de (key, juego): cambia al resetear, así una jugada repetida
+# después del reset no recibe la respuesta guardada de antes
+PLAY_GENERATION_PREFIX = 'nerdle:play_generation:'
+
+
+def default_limit():
+    return getattr(settings, 'PLAY_RATE_LIMIT', 120)
+
+
+def burst():
+    return getattr(settings, 'PLAY_RATE_BURST', 20)
+
+
+def dedup_seconds():
+    return getattr(settings, 'PLAY_DEDUP_SECONDS', 5)
+
+
+def game_limit_key(game_id):
+    return f'{GAME_LIMIT_PREFIX}{game_id}'
+
+
+def _resolve_game_limit(game_id):
+    # Jugadas por minuto: la del juego, si no la más estricta de sus torneos, si
+    # no PLAY_RATE_LIMIT. 0 desactiva el límite.
+    row = Game.objects.filter(id=game_id) \
+        .annotate(tournament_limit=Min('tournaments__play_rate_limit')) \
+        .values_list('play_rate_limit', 'tournament_limit').first()
+    if row is None:
+        return default_limit()
+    game_limit, tournament_limit = row
+    if game_limit is not None:
+        return game_limit
+    if tournament_limit is not None:
+        return tournament_limit
+    return default_limit()
+
+
+def game_limit(game_id):
+    key = game_limit_key(game_id)
+    limit = cache.get(key)
+    if limit is None:
+        limit = _resolve_game_limit(game_id)
+        cache.set(key, limit, timeout=GAME_LIMIT_CACHE_TIMEOUT)
+    return limit
+
+
+def invalidate_game_limits(game_ids):
+    cache.delete_many([game_limit_key(game_id) for game_id in game_ids])
+
+
+def _refill(state, per_minute, capacity, cost, now):
+    # Devuelve (nuevo estado, permitido, segundos hasta tener 'cost' tokens)
+    rate = per_minute / 60
+    tokens, last = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - last) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), True, 0
+    return (tokens, now), False, (cost - tokens) / rate
+
+
+def bucket_key(player_key, game_id):
+    return f'{RATE_LIMIT_PREFIX}{player_key}:{game_id}'
+
+
+def take(player_key, game_id, cost=1):
+    # (permitido, segundos a esperar). No toca la BD salvo para resolver el
+    # límite de un juego que no está en el caché.
+    per_minute = game_limit(game_id)
+    if not per_minute:
+        return True, 0
+    capacity = max(burst(), cost)
+    key = bucket_key(player_key, game_id)
+    state, allowed, retry_after = _refill(cache.get(key), per_minute, capacity, cost, time.time())
+    # El balde se llena en capacity / rate segundos; después de eso no hace falta guardarlo
+    cache.set(key, state, timeout=math.ceil(capacity * 60 / per_minute) + 1)
+    return allowed, retry_after
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse('Demasiadas jugadas para esta KEY y juego, intenta más tarde', status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def generation_key(player_key, game_id):
+    return f'{PLAY_GENERATION_PREFIX}{player_key}:{int(game_id)}'
+
+
+def new_generation(player_key, game_id):
+    # Basta con que dure lo que una respuesta guardada: al expirar vuelve a 0,
+    # y para entonces ya expiraron las respuestas de antes del reset
+    if dedup_seconds():
+        cache.set(generation_key(player_key, game_id), time.time_ns(), timeout=dedup_seconds())
+
+
+def _play_response_key(player_key, game_id, equality, all_errors, generation):
+    digest = hashlib.sha1(f'{player_key}\0{game_id}\0{equality}\0{all_errors:d}\0{generation}'.encode()).hexdigest()
+    return f'{PLAY_RESPONSE_PREFIX}{digest}'
+
+
+def play_response_key(player_key, game_id, equality, all_errors):
+    generation = cache.get(generation_key(player_key, game_id), 0) if dedup_seconds() else 0
+    return _play_response_key(player_key, game_id, equality, all_errors, generation)
+
+
+async def aplay_response_key(player_key, game_id, equality, all_errors):
+    generation = await cache.aget(generation_key(player_key, game_id), 0) if dedup_seconds() else 0
+    return _play_response_key(player_key, game_id, equality, all_errors, generation)
+
+
+def begin_play(key):
+    # None si la jugada puede procesarse (y queda marcada como en curso), o la
+    # respuesta a devolver: la ya calculada o un 429 si otra igual está en curso
+    if not dedup_seconds():
+        return None
+    entry = cache.get(key)
+    if entry is None and cache.add(key, PLAY_PENDING, timeout=dedup_seconds()):
+        return None
+    if entry is None or entry == PLAY_PENDING:
+        return too_many_requests(1)
+    status, content, content_type = entry
+    return HttpResponse(content, status=status, content_type=content_type)
+
+
+def replayable(response):
+    # Ni los errores del servidor ni los 429 (rate limit, otra jugada en curso)
+    # son el resultado de la jugada: un reintento debe procesarse de nuevo
+    return response is not None and response.status_code < 500 and response.status_code != 429
+
+
+def finish_play(key, response):
+    if not dedup_seconds():
+        return
+    if not replayable(response):
+        cache.delete(key)
+    else:
+        cache.set(key, (response.status_code, response.content, response['Content-Type']),
+                  timeout=dedup_seconds())
+
+
+async def abegin_play(key):
+    if not dedup_seconds():
+        return None
+    entry = await cache.aget(key)
+    if entry is None and await cache.aadd(key, PLAY_PENDING, timeout=dedup_seconds()):
+        return None
+    if entry is None or entry == PLAY_PENDING:
+        return too_many_requests(1)
+    status, content, content_type = entry
+    return HttpResponse(content, status=status, content_type=content_type)
+
+
+async def afinish_play(key, response):
+    if not dedup_seconds():
+        return
+    if not replayable(response):
+        await cache.adelete(key)
+    else:
+        await cache.aset(key, (response.status_code, response.content, response['Content-Type']),
+                         timeout=dedup_seconds())
@@ -0,0 +1,125 @@
+from functools import lru_cache
+
+from nerdle_api.expressions import resolve
+
+
+DIGIT_SYMBOLS = tuple(str(d) for d in range(0, 10))
+
+
+@lru_cache(maxsize=256)
+def symbol_set(operators):
+    return frozenset(DIGIT_SYMBOLS + tuple(operators) + ('=',))
+
+
+def valid_pow(sub_operation, operators):
+    # El exponente puede tener como máximo dos dígitos
+    len_digits = len(sub_operation)
+    for i, c in enumerate(sub_operation):
+        if c in operators:
+            len_digits = i
+            break
+    return len_digits <= 2
+
+
+class EqualityCheck:
+    """Resultado de validar una igualdad en una sola pasada.
+
+    ``error`` es el primer código de ERROR_TYPES que no se cumple (o None) y
+    ``errors`` la lista de todos los detectados cuando se pide ``all_errors``.
+    ``lhs``/``rhs`` y ``balanced`` sólo se calculan si la validación llega a
+    la comprobación de igualdad ('I').
+    """
+
+    def __init__(self, equality):
+        self.equality = equality
+        self.errors = []
+        self.equals_pos = -1
+        self.pow_pos = -1
+        self.lhs = None
+        self.rhs = None
+        self.balanced = None
+
+    def __repr__(self):
+        return f'<EqualityCheck {self.equality!r} errors={self.errors}>'
+
+    @property
+    def error(self):
+        return self.errors[0] if self.errors else None
+
+    @property
+    def is_valid(self):
+        return not self.errors
+
+
+def check_equality(equality, eq_length, operators, all_errors=False, index=None):
+    check = EqualityCheck(equality)
+    errors = check.errors
+    symbols = symbol_set(operators)
+
+    equals_count = 0
+    pow_count = 0
+    invalid_symbol = False
+    for pos, c in enumerate(equality):
+        if c == '=':
+            if equals_count == 0:
+                check.equals_pos = pos
+            equals_count += 1
+        elif c == '^':
+            if pow_count == 0:
+                check.pow_pos = pos
+            pow_count += 1
+        if c not in symbols:
+            invalid_symbol = True
+
+    if len(equality) != eq_length:  # length
+        errors.append('L')
+        if not all_errors:
+            return check
+    if equals_count < 1:  # una igualdad
+        errors.append('E')
+        if not all_errors:
+            return check
+    elif equals_count > 1:  # una igualdad
+        errors.append('M')
+        if not all_errors:
+            return check
+    if pow_count > 1:  # multiples elevados
+        errors.append('P')
+        if not all_errors:
+            return check
+    if invalid_symbol:  # simbolos validos
+        errors.append('S')
+        if not all_errors:
+            return check
+
+    if equals_count < 1:
+        # Sin signo igual no hay lado derecho que revisar
+        return check
+
+    equals_pos = check.equals_pos
+    if not equality[equals_pos + 1:].lstrip('-').isnumeric():  # numero a la derecha
+        errors.append('R')
+        if not all_errors:
+            return check
+    if pow_count == 1 and not valid_pow(equality[check.pow_pos + 1:equals_pos], operators):
+        errors.append('X')
+        if not all_errors:
+            return check
+
+    if equals_count > 1 or pow_count > 1 or invalid_symbol or 'L' in errors or 'R' in errors or 'X' in errors:
+        # No se evalúan expresiones mal formadas, de largo arbitrario ni potencias sin acotar
+        return check
+
+    if index is not None and equality in index:
+        # Igualdad conocida del índice precalculado: no hace falta evaluarla
+        check.lhs = check.rhs = int(equality[equals_pos + 1:])
+        check.balanced = True
+        return check
+
+    check.lhs = resolve(equality[:equals_pos])
+    check.rhs = resolve(equality[equals_pos + 1:])
+    check.balanced = check.lhs is not None and check.rhs is not None and check.lhs == check.rhs
+    if not check.balanced:  # igualdad valida
+        errors.append('I')
+
+    return check
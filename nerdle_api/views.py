@@ -1,19 +1,212 @@
+import json
+from contextlib import nullcontext
 from datetime import datetime, timezone
 
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.db import transaction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, HttpResponseBadRequest, \
+    HttpResponseNotModified, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 from django.views import View
 
-from nerdle_api.models import Game, Player, Play
+from nerdle_api import standings, throttling, write_behind
+from nerdle_api.exports import EXPORT_FORMATS, export_lines
+from nerdle_api.game_cache import get_active_game, get_open_games
+from nerdle_api.metrics import registry
+from nerdle_api.models import Game, Player, Play, PlayerGameState, ERROR_TYPES
+
+
+ERROR_TYPES_DISPLAY = dict(ERROR_TYPES)
+
+PLAY_BATCH_MAX_SIZE = 200
+
+
+def invalid_equality_message(equality, check, all_errors=False):
+    errors = check.errors if all_errors else check.errors[:1]
+    errors = ', '.join(ERROR_TYPES_DISPLAY[e] for e in errors)
+    return f'La igualdad {equality} no cumple alguna de las condiciones requeridas: {errors}'
+
+
+def submit_play(player, player_key, game_id, equality, all_errors=False):
+    # Registra una jugada y devuelve la respuesta HTTP. Contador, estado y
+    # jugada van en una sola sentencia (Play.save_with_state). Es síncrona:
+    # la versión async la ejecuta con sync_to_async.
+    game = get_active_game(game_id)
+    if game is None:
+        if player_key == "PROF123":
+            game = Game.objects.filter(id=game_id).first()
+        if game is None:
+            player.add_play()
+            return HttpResponseBadRequest(
+                'El id del juego entregado no existe o no está activo')
+
+    # La jugada se calcula completa en memoria; eqs_state se acumula en la BD
+    play, check = game.build_play(player, equality, all_errors=all_errors)
+    if not play.save_with_state():
+        return JsonResponse({"result": 'Juego ya finalizado',
+                             'finished': True})
+
+    if not check.is_valid:
+        return HttpResponseBadRequest(invalid_equality_message(equality, check, all_errors))
+
+    transaction.on_commit(lambda: standings.record_play(play))
+
+    return JsonResponse({"result": play.results,
+                         'equalities_state': play.eqs_state,
+                         'finished': play.finished})
+
+
+def submit_play_deferred(player, player_key, game_id, equality, all_errors=False):
+    # Como submit_play pero sin escribir en la BD (PLAY_WRITE_BEHIND): el
+    # estado sale del caché y la jugada y el contador van a write_behind.
+    game = get_active_game(game_id)
+    if game is None:
+        if player_key == "PROF123":
+            game = Game.objects.filter(id=game_id).first()
+        if game is None:
+            write_behind.enqueue(player.id)
+            return HttpResponseBadRequest(
+                'El id del juego entregado no existe o no está activo')
+
+    try:
+        with write_behind.pair_lock(player.id, game.id):
+            state = write_behind.get_state(player, game)
+            if state.finished:
+                write_behind.enqueue(player.id)
+                return JsonResponse({"result": 'Juego ya finalizado',
+                                     'finished': True})
+
+            play, check = game.build_play(player, equality, state.eqs_state, all_errors=all_errors)
+            write_behind.enqueue(player.id, play)
+
+            if not check.is_valid:
+                return HttpResponseBadRequest(invalid_equality_message(equality, check, all_errors))
+
+            state.plays_count += 1
+            state.eqs_state = play.eqs_state
+            state.finished = play.finished
+            write_behind.set_state(state)
+    except write_behind.PairLocked:
+        # Otra jugada del mismo jugador y juego sigue en curso
+        return throttling.too_many_requests(1)
+
+    standings.record_play(play)
+    return JsonResponse({"result": play.results,
+                         'equalities_state': play.eqs_state,
+                         'finished': play.finished})
+
+
+def play_submitter():
+    return submit_play_deferred if write_behind.enabled() else submit_play
+
+
+def guarded_play(player_key, game_id, equality, all_errors, process):
+    # Antes de tocar la BD: una jugada idéntica reciente devuelve la misma
+    # respuesta, y si no, se descuenta del token bucket de (key, juego).
+    key = throttling.play_response_key(player_key, game_id, equality, all_errors)
+    response = throttling.begin_play(key)
+    if response is not None:
+        return response
+
+    allowed, retry_after = throttling.take(player_key, game_id)
+    if not allowed:
+        throttling.finish_play(key, None)
+        return throttling.too_many_requests(retry_after)
+
+    response = None
+    try:
+        response = process()
+    finally:
+        throttling.finish_play(key, response)
+    return response
+
+
+def reset_plays(player, game):
+    # El estado no se borra sino que se vacía y guarda reset_at: con
+    # write-behind, las jugadas anteriores que sigan en la cola de cualquier
+    # worker se descartan al insertarse. El lock del par asegura que ninguna
+    # jugada se esté calculando sobre el estado de antes. Puede lanzar
+    # write_behind.PairLocked.
+    lock = write_behind.pair_lock(player.id, game.id) if write_behind.enabled() else nullcontext()
+    with lock, transaction.atomic():
+        # Primero el estado, que queda bloqueado frente a un flush en curso, y
+        # después las jugadas (así se ven las que ese flush haya insertado)
+        PlayerGameState.objects.update_or_create(
+            player=player, game=game,
+            defaults={'plays_count': 0, 'eqs_state': None, 'finished': False, 'last_play': None,
+                      'reset_at': datetime.now(timezone.utc)})
+        Play.objects.filter(game=game, player=player).delete()
+        transaction.on_commit(lambda: standings.reset_player(game.id, player.id))
+        transaction.on_commit(lambda: write_behind.forget_state(player.id, game.id))
+        transaction.on_commit(lambda: throttling.new_generation(player.key, game.id))
+
+
+def player_game_state(player, game):
+    if write_behind.enabled():
+        return write_behind.get_state(player, game)
+    return PlayerGameState.objects.filter(player=player, game=game).first()
+
+
+def status_response(game_id, state):
+    plays_count = state.plays_count if state is not None else 0
+
+    if plays_count > 0 and state.finished:
+        return JsonResponse({"finished": True, 'plays': plays_count, 'game': game_id})
+    else:
+        return JsonResponse({"finished": False, 'plays': plays_count, 'game': game_id})
+
+
+def parse_since(value):
+    # ISO 8601 (sin zona se asume UTC) o segundos desde epoch
+    if value.replace('.', '', 1).isdigit():
+        try:
+            return datetime.fromtimestamp(float(value), timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            # Fuera del rango de datetime
+            return None
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        return None
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since
+
+
+def open_games_response(request, entry):
+    # Con If-None-Match/If-Modified-Since vigentes se responde 304 sin tocar la
+    # BD ni serializar: la lista ya viene armada desde el caché.
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        not_modified = '*' in etags or entry['etag'] in etags
+    else:
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        not_modified = if_modified_since is not None \
+            and int(entry['last_modified'].timestamp()) <= if_modified_since
+
+    if not_modified:
+        response = HttpResponseNotModified()
+    elif 'since' in request.GET:
+        since = parse_since(request.GET['since'])
+        if since is None:
+            return HttpResponseBadRequest(
+                f'El parámetro since debe ser una fecha ISO 8601 o un timestamp: {request.GET["since"]}')
+        response = JsonResponse({"games": [data for data, changed in entry['games'] if changed > since]})
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'].timestamp())
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 class NerdleGamesView(View):
 
     def get(self, request):
-        open_games = Game.objects.filter(start__lte=datetime.now(timezone.utc),
-                                         end__gte=datetime.now(timezone.utc))
-
-        open_games_list = [g.to_dict() for g in open_games]
-        return JsonResponse({"games": open_games_list})
+        return open_games_response(request, get_open_games())
 
 
 class NerdlePlayView(View):
@@ -22,6 +215,7 @@ class NerdlePlayView(View):
         game_id = request.POST.get('game', None)
         player_key = request.POST.get('key', None)
         equality = request.POST.get('equality', None)
+        all_errors = request.POST.get('all_errors', '').lower() in ('1', 'true')
 
         if game_id is None or player_key is None or equality is None:
             return HttpResponseBadRequest(
@@ -31,54 +225,99 @@ class NerdlePlayView(View):
             return HttpResponseBadRequest(
                 f'El id del juego debe ser un número: {game_id}')
 
-        player = Player.objects.filter(key=player_key).first()
-        if player is None:
-            return HttpResponseBadRequest(
-                'No hay ningún jugador para la KEY dada')
-        else:
-            player.add_play()
-
-        game = Game.objects.filter(id=game_id,
-                                   end__gte=datetime.now(timezone.utc)).first()
-        if game is None:
-            if player_key == "PROF123":
-                game = Game.objects.filter(id=game_id)
-            if game is None:
+        def process():
+            player = Player.objects.filter(key=player_key).first()
+            if player is None:
                 return HttpResponseBadRequest(
-                    'El id del juego entregado no existe o no está activo')
+                    'No hay ningún jugador para la KEY dada')
+
+            return play_submitter()(player, player_key, game_id, equality, all_errors)
 
-        previous_state = player.last_valid_play(game)
-        if previous_state is not None and previous_state.finished:
-            return JsonResponse({"result": 'Juego ya finalizado',
-                                 'finished': True})
+        return guarded_play(player_key, game_id, equality, all_errors, process)
 
-        play = Play.objects.create(game=game,
-                                   player=player,
-                                   equality=equality)
-        play.save()
 
-        if not game.check_play(equality):
-            play.is_valid = False
-            play.error_type = game.equality_error(equality)
-            play.save()
+class NerdlePlayBatchView(View):
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
             return HttpResponseBadRequest(
-                f'La igualdad {equality} no cumple alguna de las condiciones requeridas: {play.get_error_type_display()}')
+                'El cuerpo del POST para esta vista debe ser un JSON')
 
-        play.results = game.evaluate(equality)
-        eqs_state = [r == '2'*game.eq_length for r in play.results]
+        if not isinstance(data, dict):
+            data = {}
+        game_id = data.get('game', None)
+        player_key = data.get('key', None)
+        equalities = data.get('equalities', None)
+        all_errors = bool(data.get('all_errors', False))
 
-        if previous_state is not None and previous_state.eqs_state is not None:
-            eqs_state = [s1 or previous_state.eqs_state[i] for i, s1 in enumerate(eqs_state)]
+        if game_id is None or player_key is None or not isinstance(equalities, list):
+            return HttpResponseBadRequest(
+                'El POST para esta vista DEBE contener los siguientes parámetros: game, key, equalities (lista)')
 
-        play.eqs_state = eqs_state
+        if not str(game_id).isnumeric():
+            return HttpResponseBadRequest(
+                f'El id del juego debe ser un número: {game_id}')
+
+        if len(equalities) > PLAY_BATCH_MAX_SIZE or not all(isinstance(e, str) for e in equalities):
+            return HttpResponseBadRequest(
+                f'equalities debe ser una lista de a lo más {PLAY_BATCH_MAX_SIZE} igualdades')
 
-        play.finished = all(play.eqs_state)
+        allowed, retry_after = throttling.take(player_key, game_id, cost=max(1, len(equalities)))
+        if not allowed:
+            return throttling.too_many_requests(retry_after)
 
-        play.save()
+        player = Player.objects.filter(key=player_key).first()
+        if player is None:
+            return HttpResponseBadRequest(
+                'No hay ningún jugador para la KEY dada')
+
+        game = get_active_game(game_id)
+        if game is None:
+            return HttpResponseBadRequest(
+                'El id del juego entregado no existe o no está activo')
 
-        return JsonResponse({"result": play.results,
-                             'equalities_state': play.eqs_state,
-                             'finished': play.finished})
+        # Con write-behind, el estado en la BD debe incluir lo encolado en este proceso
+        write_behind.flush()
+        with transaction.atomic():
+            state = PlayerGameState.for_update(player, game)
+            if state.finished:
+                return JsonResponse({"result": 'Juego ya finalizado',
+                                     'finished': True})
+
+            plays = []
+            results = []
+            eqs_state = state.eqs_state
+            for equality in equalities:
+                play, check = game.build_play(player, equality, eqs_state, all_errors=all_errors)
+                plays.append(play)
+                if not check.is_valid:
+                    results.append({'equality': equality,
+                                    'error': invalid_equality_message(equality, check, all_errors)})
+                    continue
+
+                eqs_state = play.eqs_state
+                results.append({'equality': equality,
+                                'result': play.results,
+                                'equalities_state': play.eqs_state,
+                                'finished': play.finished})
+                if play.finished:
+                    break
+
+            player.add_play(len(plays))
+            Play.objects.bulk_create(plays)
+
+            valid_plays = [p for p in plays if p.is_valid]
+            state.record_plays(valid_plays)
+            for play in valid_plays:
+                transaction.on_commit(lambda play=play: standings.record_play(play))
+            transaction.on_commit(lambda: write_behind.forget_state(player.id, game.id))
+
+        return JsonResponse({'results': results,
+                             'processed': len(plays),
+                             'equalities_state': state.eqs_state,
+                             'finished': state.finished})
 
 
 class NerdleResetView(View):
@@ -100,8 +339,7 @@ class NerdleResetView(View):
             return HttpResponseBadRequest(
                 'No hay ningún jugador para la KEY dada')
 
-        game = Game.objects.filter(id=game_id,
-                                   end__gte=datetime.now(timezone.utc)).first()
+        game = get_active_game(game_id)
         if game is None:
             return HttpResponseBadRequest(
                 'El id del juego entregado no existe o no está activo')
@@ -110,7 +348,10 @@ class NerdleResetView(View):
             return HttpResponseBadRequest(
                 'Este juego no permite ser reseteado')
 
-        Play.objects.filter(game=game, player=player).delete()
+        try:
+            reset_plays(player, game)
+        except write_behind.PairLocked:
+            return throttling.too_many_requests(1)
 
         return JsonResponse({"result": 'Se eliminaron las jugadas', 'game': game_id})
 
@@ -130,16 +371,77 @@ class NerdleStatusView(View):
             return HttpResponseBadRequest(
                 'No hay ningún jugador para la KEY dada')
 
-        game = Game.objects.filter(id=game_id,
-                                   end__gte=datetime.now(timezone.utc)).first()
+        game = get_active_game(game_id)
         if game is None:
             return HttpResponseBadRequest(
                 'El id del juego entregado no existe o no está activo')
 
-        plays_count = player.game_plays_count(game)
-        last_play = player.last_valid_play(game)
+        return status_response(game_id, player_game_state(player, game))
+
+
+class NerdleStandingsView(View):
+
+    def get(self, request, tournament_id):
+        entry = standings.get_standings(tournament_id)
+        if entry is None:
+            return HttpResponseBadRequest(
+                'El id del torneo entregado no existe')
+
+        game_ids = [g['id'] for g in entry['games']]
+
+        ranking = []
+        for position, p in enumerate(standings.rank(entry['players'], game_ids), start=1):
+            ranking.append({'position': position,
+                            'name': p['name'],
+                            'finished': p['fs'],
+                            'plays': p['total'],
+                            'games': [dict(g, game=g_id) for g_id, g in zip(game_ids, p['games'])]})
+
+        return JsonResponse({'tournament': entry['id'],
+                             'name': entry['name'],
+                             'games': entry['games'],
+                             'standings': ranking})
+
+
+class NerdlePlayExportView(View):
+
+    def get(self, request):
+        token = getattr(settings, 'EXPORT_TOKEN', '')
+        authorized = request.user.is_staff or \
+            (token and request.headers.get('Authorization', '') == f'Bearer {token}')
+        if not authorized:
+            return HttpResponseForbidden()
+
+        game_id = request.GET.get('game', None)
+        tournament_id = request.GET.get('tournament', None)
+        export_format = request.GET.get('format', 'csv')
+
+        if (game_id is None) == (tournament_id is None):
+            return HttpResponseBadRequest(
+                'El GET para esta vista DEBE contener uno de los siguientes parámetros: game, tournament')
+
+        target_id = game_id if game_id is not None else tournament_id
+        if not target_id.isnumeric():
+            return HttpResponseBadRequest(
+                f'El id debe ser un número: {target_id}')
+
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest(
+                f'Formato no soportado: {export_format} (opciones: {", ".join(EXPORT_FORMATS)})')
+
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_lines(export_format, game_id, tournament_id),
+                                         content_type=f'{content_type}; charset=utf-8')
+        target = f'game-{game_id}' if game_id is not None else f'tournament-{tournament_id}'
+        response['Content-Disposition'] = f'attachment; filename="plays-{target}.{export_format}"'
+        return response
+
+
+class MetricsView(View):
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token and request.headers.get('Authorization', '') != f'Bearer {token}':
+            return HttpResponseForbidden()
 
-        if plays_count > 0 and last_play.finished:
-            return JsonResponse({"finished": True, 'plays': plays_count, 'game': game_id})
-        else:
-            return JsonResponse({"finished": False, 'plays': plays_count, 'game': game_id})
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
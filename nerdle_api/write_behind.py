@@ -0,0 +1,383 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections, models, transaction
+from django.utils.dateparse import parse_datetime
+
+from nerdle_api.models import Game, Play, Player, PlayerGameState, PlayJournalSegment
+
+
+logger = logging.getLogger(__name__)
+
+# Modo write-behind de /api/play/ (PLAY_WRITE_BEHIND): la respuesta se calcula
+# con el estado (jugador, juego) del caché y la jugada y el incremento de
+# play_count se encolan en memoria. Antes de encolarse se agregan a un journal
+# append-only del proceso ({host}-{pid}-{inicio}-{n}.jsonl); un thread los
+# inserta por lotes y borra el segmento cuando la transacción terminó. Los
+# segmentos que quedan de un proceso que murió se reinsertan al partir el
+# siguiente o con manage.py flush_play_journal; PlayJournalSegment evita
+# insertar dos veces un segmento que alcanzó a guardarse.
+
+STATE_PREFIX = 'nerdle:play_state:'
+# El estado en caché se recarga de PlayerGameState si se pierde; basta con
+# que dure bastante más que el intervalo entre flushes
+STATE_CACHE_TIMEOUT = 24 * 3600
+
+SEGMENT_SUFFIX = '.jsonl'
+
+# Lock por (jugador, juego) en el caché compartido, para que dos workers no
+# calculen una jugada sobre el mismo estado. Expira solo si el proceso que lo
+# tiene muere; quien no lo consigue en LOCK_WAIT segundos recibe PairLocked.
+LOCK_PREFIX = 'nerdle:play_lock:'
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2
+LOCK_RETRY_SECONDS = 0.005
+
+
+class PairLocked(Exception):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'PLAY_WRITE_BEHIND', False)
+
+
+def journal_dir():
+    return Path(getattr(settings, 'PLAY_JOURNAL_DIR', Path(settings.BASE_DIR) / 'play_journal'))
+
+
+def flush_interval():
+    return getattr(settings, 'PLAY_FLUSH_INTERVAL', 0.5)
+
+
+def batch_size():
+    return getattr(settings, 'PLAY_FLUSH_BATCH', 500)
+
+
+def journal_fsync():
+    return getattr(settings, 'PLAY_JOURNAL_FSYNC', False)
+
+
+@contextmanager
+def pair_lock(player_id, game_id):
+    key = f'{LOCK_PREFIX}{player_id}:{game_id}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(key, token, timeout=LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise PairLocked(key)
+        time.sleep(LOCK_RETRY_SECONDS)
+    try:
+        yield
+    finally:
+        # Si expiró y lo tomó otro, no se le borra
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def state_key(player_id, game_id):
+    return f'{STATE_PREFIX}{player_id}:{game_id}'
+
+
+def get_state(player, game):
+    # PlayerGameState sin guardar que ya incluye las jugadas encoladas
+    cached = cache.get(state_key(player.id, game.id))
+    if cached is None:
+        state = PlayerGameState.objects.filter(player=player, game=game).first() \
+            or PlayerGameState(player=player, game=game)
+        set_state(state)
+        return state
+    plays_count, eqs_state, finished = cached
+    return PlayerGameState(player=player, game=game, plays_count=plays_count,
+                           eqs_state=eqs_state, finished=finished)
+
+
+def set_state(state):
+    cache.set(state_key(state.player_id, state.game_id),
+              (state.plays_count, state.eqs_state, state.finished), timeout=STATE_CACHE_TIMEOUT)
+
+
+def forget_state(player_id, game_id):
+    cache.delete(state_key(player_id, game_id))
+
+
+def play_record(player_id, play=None):
+    # Línea del journal: un incremento de play_count y, si hay, la jugada
+    record = {'player': player_id, 'count': 1}
+    if play is not None:
+        record['play'] = {
+            'game': play.game_id,
+            'equality': play.equality,
+            'is_valid': play.is_valid,
+            'error_type': play.error_type,
+            'results': play.results,
+            'eqs_state': play.eqs_state,
+            'finished': play.finished,
+            'created': play.created.isoformat(),
+        }
+    return record
+
+
+def record_play(player_id, data):
+    return Play(player_id=player_id, game_id=data['game'], equality=data['equality'],
+                is_valid=data['is_valid'], error_type=data['error_type'],
+                results=data['results'], eqs_state=data['eqs_state'],
+                finished=data['finished'], created=parse_datetime(data['created']))
+
+
+def persist(name, records):
+    # Inserta un segmento en una transacción; si ya estaba, no hace nada.
+    # Devuelve la cantidad de jugadas insertadas.
+    with transaction.atomic():
+        if PlayJournalSegment.objects.filter(name=name).exists():
+            return 0
+
+        # Jugadores o juegos borrados mientras la jugada estaba en la cola
+        player_ids = set(Player.objects.filter(id__in={r['player'] for r in records})
+                         .values_list('id', flat=True))
+        game_ids = set(Game.objects.filter(id__in={r['play']['game'] for r in records if 'play' in r})
+                       .values_list('id', flat=True))
+        records = [r for r in records if r['player'] in player_ids
+                   and ('play' not in r or r['play']['game'] in game_ids)]
+
+        counts = Counter()
+        for r in records:
+            counts[r['player']] += r['count']
+        for player_id, count in sorted(counts.items()):
+            Player.objects.filter(pk=player_id).update(play_count=models.F('play_count') + count)
+
+        # Los estados de los pares se bloquean antes de insertar (siempre en el
+        # mismo orden, para no bloquearse con otro flush ni con un reset). Las
+        # jugadas creadas hasta el último reset del par ya no cuentan.
+        plays = [record_play(r['player'], r['play']) for r in records if 'play' in r]
+        states = locked_states({(play.player_id, play.game_id) for play in plays})
+        plays = [play for play in plays if not reset_after(states.get((play.player_id, play.game_id)), play)]
+        Play.objects.bulk_create(plays)
+
+        valid = {}
+        for play in plays:
+            if play.is_valid:
+                valid.setdefault((play.player_id, play.game_id), []).append(play)
+        for (player_id, game_id), pair_plays in sorted(valid.items()):
+            state = states.get((player_id, game_id))
+            if state is None:
+                state, _ = PlayerGameState.objects.select_for_update() \
+                    .get_or_create(player_id=player_id, game_id=game_id)
+            state.merge_plays(pair_plays)
+
+        PlayJournalSegment.objects.create(name=name)
+    return len(plays)
+
+
+def locked_states(pairs):
+    # {(jugador, juego): PlayerGameState} de los que existen, con select_for_update
+    if not pairs:
+        return {}
+    condition = models.Q()
+    for player_id, game_id in pairs:
+        condition |= models.Q(player_id=player_id, game_id=game_id)
+    states = PlayerGameState.objects.select_for_update().filter(condition).order_by('player_id', 'game_id')
+    return {(state.player_id, state.game_id): state for state in states}
+
+
+def reset_after(state, play):
+    return state is not None and state.reset_at is not None and play.created <= state.reset_at
+
+
+def finish_segment(path):
+    # Después del commit: primero el archivo, luego la marca
+    path.unlink(missing_ok=True)
+    PlayJournalSegment.objects.filter(name=path.name).delete()
+
+
+def read_segment(path):
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for n, line in enumerate(f, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Sólo la última línea puede quedar a medias si el proceso murió escribiéndola
+                logger.warning('Línea %s inválida en %s, se omite', n, path)
+    return records
+
+
+def _segment_owner(path):
+    # (host, pid, inicio) del proceso que escribió el segmento
+    host, pid, started, _ = path.name[:-len(SEGMENT_SUFFIX)].rsplit('-', 3)
+    return host, int(pid), started
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def orphan_segments(directory=None, include_all=False, exclude_prefix=None):
+    # Segmentos de procesos de este host que ya no existen (o todos, salvo los
+    # de la cola de este proceso). Los de otros hosts no se pueden comprobar y
+    # sólo se incluyen con include_all; un pid reutilizado los posterga.
+    directory = Path(directory or journal_dir())
+    if not directory.is_dir():
+        return []
+    if exclude_prefix is None and _queue is not None and _queue.pid == os.getpid():
+        exclude_prefix = _queue.prefix
+    hostname = socket.gethostname()
+    orphans = []
+    for path in sorted(directory.glob(f'*{SEGMENT_SUFFIX}')):
+        if exclude_prefix is not None and path.name.startswith(f'{exclude_prefix}-'):
+            continue
+        if not include_all:
+            try:
+                host, pid, _ = _segment_owner(path)
+            except ValueError:
+                continue
+            if host != hostname or (pid != os.getpid() and _process_alive(pid)):
+                continue
+        orphans.append(path)
+    return orphans
+
+
+def recover(directory=None, include_all=False, exclude_prefix=None):
+    # Reinserta los segmentos huérfanos; devuelve (segmentos, jugadas)
+    segments = inserted = 0
+    for path in orphan_segments(directory, include_all, exclude_prefix):
+        inserted += persist(path.name, read_segment(path))
+        finish_segment(path)
+        segments += 1
+    return segments, inserted
+
+
+class PlayQueue:
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.pid = os.getpid()
+        self.prefix = f'{socket.gethostname()}-{self.pid}-{int(time.time() * 1000)}'
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()
+        self._seq = itertools.count()
+        self._records = []
+        # [(segmento, registros)] cerrados y aún no insertados, en orden
+        self._pending = []
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='play-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open_segment(self):
+        self._segment = self.directory / f'{self.prefix}-{next(self._seq):06d}{SEGMENT_SUFFIX}'
+        self._file = open(self._segment, 'a', encoding='utf-8')
+
+    def put(self, records):
+        # Vuelve cuando los registros están en el journal (y en disco con PLAY_JOURNAL_FSYNC)
+        data = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            if journal_fsync():
+                os.fsync(self._file.fileno())
+            self._records.extend(records)
+            full = len(self._records) >= batch_size()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        # Inserta todo lo encolado hasta ahora; si la BD falla, los segmentos
+        # quedan pendientes para el siguiente intento
+        with self._flush_lock:
+            with self._lock:
+                if self._records:
+                    self._file.close()
+                    self._pending.append((self._segment, self._records))
+                    self._records = []
+                    self._open_segment()
+            while self._pending:
+                path, records = self._pending[0]
+                persist(path.name, records)
+                self._pending.pop(0)
+                finish_segment(path)
+
+    def _run(self):
+        try:
+            recover(self.directory, exclude_prefix=self.prefix)
+        except Exception:
+            logger.exception('No se pudieron reinsertar los segmentos huérfanos de %s', self.directory)
+        while not self._closing.is_set():
+            self._wakeup.wait(flush_interval())
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Error insertando las jugadas encoladas')
+            finally:
+                close_old_connections()
+        connections.close_all()
+
+    def close(self):
+        # Detiene el thread e inserta lo que quede; si la BD no responde, el
+        # journal queda para recover()
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Quedan jugadas sin insertar en %s', self.directory)
+        with self._lock:
+            self._file.close()
+            if not self._records:
+                self._segment.unlink(missing_ok=True)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    # Una cola por proceso (después de un fork se crea otra)
+    global _queue
+    with _queue_lock:
+        if _queue is None or _queue.pid != os.getpid():
+            _queue = PlayQueue(journal_dir())
+        return _queue
+
+
+def enqueue(player_id, play=None):
+    get_queue().put([play_record(player_id, play)])
+
+
+def flush():
+    # Inserta lo encolado en este proceso (p.ej. antes de resetear un juego)
+    if _queue is not None and _queue.pid == os.getpid():
+        _queue.flush()
+
+
+def shutdown():
+    global _queue
+    with _queue_lock:
+        if _queue is not None and _queue.pid == os.getpid():
+            _queue.close()
+        _queue = None